@@ -5,7 +5,11 @@ multiple email addresses).
 
 Usage examples:
   python3 opsAdmin.py --dups
+  python3 opsAdmin.py --dups --fuzzy
   python3 opsAdmin.py --dups --output duplicates.csv
+  python3 opsAdmin.py --batch offboard.yaml
+  python3 opsAdmin.py --moveuser SRC DST --dry-run --record moveuser.jsonl.gz
+  python3 opsAdmin.py --moveuser SRC DST --dry-run --replay moveuser.jsonl.gz
 
 This script reuses the existing credential helper `get_login_config` from
 `opsMiles.ojira` to obtain url/user/password (email + API token for Atlassian Cloud).
@@ -13,10 +17,14 @@ This script reuses the existing credential helper `get_login_config` from
 
 import argparse
 import json
+import math
+import re
 import sys
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
 from typing import Dict, List
 
-import re
 import requests
 from jira import JIRA, JIRAError
 from requests.auth import HTTPBasicAuth
@@ -24,19 +32,22 @@ from requests.auth import HTTPBasicAuth
 from opsMiles.ojira import (
     get_login_config, list_jira_issues, get_jira_from_config,
     get_all_atlassian_users, get_account_ids_by_display_prefix,
-    list_user_groups, add_user_to_group, copy_groups,
+    list_user_groups, add_user_to_group, copy_groups, build_group_index, indexed_user_groups,
     get_issues_assigned, get_issues_watched, get_issues_reported,
     add_watcher, copy_watcher, assign_issue_quiet,
     change_reporter_quiet, copy_reporter, copy_reviewer, reassign,
     get_user_filters, share_filter, share_all_filters,
     get_user_dashboards, transfer_dashboard, transfer_user_dashboards,
-    list_user_fields
+    list_user_fields, MAX_WORKERS, EP
 )
+from opsMiles.clients import active_cassette, use_cassette, use_memo
+from opsMiles.mirror import MIRROR_DB, mirror_space
+from opsMiles.ajira import ASYNC_LIMIT
 from opsMiles.confluence import (
     process_space, process_spaces, process_single_page, get_confluence_client, update_space_ownership,
     extract_page_id_from_url, extract_space_key_from_url, get_page_owner, set_page_owner, add_user_to_update_restriction,
     transfer_personal_space, list_spaces, list_pages_in_space, replace_pages, update_single_page,
-    replace_user_in_page, replace_user_in_space, print_space_pages, get_personal_space
+    replace_user_in_page, replace_user_in_space, print_space_pages, get_personal_space, build_personal_space_index
 )
 
 
@@ -71,9 +82,172 @@ def find_duplicate_displayname_users(users: List[Dict]):
     return dups
 
 
+# Common given-name variants folded to one form so "Bob Smith" and "Robert Smith" share a token
+NICKNAMES = {
+    'bob': 'robert', 'bobby': 'robert', 'rob': 'robert', 'robbie': 'robert',
+    'bill': 'william', 'wil': 'william', 'billy': 'william', 'will': 'william', 'willy': 'william',
+    'jim': 'james', 'jimmy': 'james', 'jamie': 'james',
+    'mike': 'michael', 'mick': 'michael', 'mikey': 'michael',
+    'dave': 'david', 'davey': 'david',
+    'tom': 'thomas', 'tommy': 'thomas',
+    'dick': 'richard', 'rick': 'richard', 'rich': 'richard', 'ricky': 'richard',
+    'chris': 'christopher', 'kit': 'christopher',
+    'dan': 'daniel', 'danny': 'daniel',
+    'joe': 'joseph', 'joey': 'joseph',
+    'ken': 'kenneth', 'kenny': 'kenneth',
+    'steve': 'stephen', 'steven': 'stephen',
+    'tony': 'anthony',
+    'andy': 'andrew', 'drew': 'andrew',
+    'matt': 'matthew',
+    'pat': 'patrick',
+    'nick': 'nicholas', 'nicolas': 'nicholas',
+    'ed': 'edward', 'eddie': 'edward', 'ted': 'edward',
+    'greg': 'gregory',
+    'jeff': 'jeffrey', 'geoff': 'jeffrey', 'geoffrey': 'jeffrey',
+    'alex': 'alexander',
+    'ben': 'benjamin',
+    'sam': 'samuel',
+    'tim': 'timothy',
+    'fred': 'frederick',
+    'kate': 'katherine', 'katie': 'katherine', 'kathy': 'katherine', 'catherine': 'katherine',
+    'liz': 'elizabeth', 'beth': 'elizabeth', 'betty': 'elizabeth',
+    'jen': 'jennifer', 'jenny': 'jennifer',
+    'sue': 'susan', 'susie': 'susan',
+    'meg': 'margaret', 'maggie': 'margaret', 'peggy': 'margaret',
+}
+
+
+# Fraction of trigrams two compacted names must share to be scored
+GRAM_OVERLAP = 0.6
+
+
+def _name_tokens(display_name: str) -> list:
+    """Lower-case, accent-stripped, nickname-folded tokens of a display name."""
+    text = unicodedata.normalize('NFKD', display_name)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = text.replace("'", '').replace('\u2019', '')  # O'Mullane -> omullane
+    tokens = re.findall(r'[a-z0-9]+', text)
+    return [NICKNAMES.get(t, t) for t in tokens]
+
+
+def _ngrams(text: str, n: int = 3) -> set:
+    padded = f' {text} '
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def _pair_score(a: Dict, b: Dict) -> float:
+    """Score two pre-normalised user records in [0, 1] (higher is more likely the same person)."""
+    # soft token overlap: "jon" still pairs with "john"
+    small, large = sorted((a['tokens'], b['tokens']), key=len)
+    matched = sum(1 for t in small
+                  if t in large or any(SequenceMatcher(None, t, o).ratio() >= 0.8 for o in large))
+    overlap = matched / (len(small) + len(large) - matched)
+    # sorted-token form makes "Smith, Bob" and "Robert Smith" compare equal
+    ratio = SequenceMatcher(None, a['key'], b['key']).ratio()
+    score = 0.5 * overlap + 0.5 * ratio
+    if a['domain'] and a['domain'] == b['domain']:
+        score += 0.05
+    if a['local'] and a['local'] == b['local']:
+        score += 0.1
+    # an old deactivated account next to an active one is the typical duplicate
+    if a['active'] != b['active']:
+        score += 0.05
+    return min(score, 1.0)
+
+
+def find_fuzzy_duplicate_users(users: List[Dict], threshold: float = 0.85, max_block: int = 200) -> Dict:
+    """Fuzzy duplicate finder using blocking so only plausible pairs are scored.
+
+    Every user is placed in blocks keyed by normalised name token and by character
+    trigram of the compacted name. Only pairs sharing their name tokens, sharing one token
+    and spelled alike overall (typos: "Jon Doe" / "John Doe"), or sharing at least
+    GRAM_OVERLAP of their trigrams, are scored; blocks bigger than max_block (very common
+    surnames, frequent trigrams) are ignored as they carry no signal.
+    Matches are grouped (transitively) and returned in the same shape as
+    find_duplicate_displayname_users: displayName -> list of user dicts.
+    """
+    recs = []
+    for u in users:
+        dn = u.get('displayName')
+        # apps and bots are not people
+        if not dn or u.get('accountType', 'atlassian') != 'atlassian':
+            continue
+        tokens = _name_tokens(dn)
+        if not tokens:
+            continue
+        email = (u.get('emailAddress') or '').lower()
+        local, _, domain = email.partition('@')
+        key = ' '.join(sorted(tokens))
+        recs.append({'user': u, 'tokens': set(tokens), 'key': key,
+                     'grams': _ngrams(key.replace(' ', '')),
+                     'local': local, 'domain': domain, 'active': bool(u.get('active'))})
+
+    # Trigram blocking uses prefix filtering: with grams ordered rarest first, two
+    # names sharing at least GRAM_OVERLAP of the longer gram set must share one of
+    # the first len - ceil(GRAM_OVERLAP * len) + 1, so only those prefixes are indexed.
+    gram_freq = Counter(g for r in recs for g in r['grams'])
+    token_index = defaultdict(list)
+    gram_index = defaultdict(list)
+    for i, r in enumerate(recs):
+        for t in r['tokens']:
+            if len(t) > 1:
+                token_index[t].append(i)
+        ordered = sorted(r['grams'], key=lambda g: (gram_freq[g], g))
+        for g in ordered[:len(ordered) - math.ceil(GRAM_OVERLAP * len(ordered)) + 1]:
+            gram_index[g].append(i)
+
+    candidates = set()
+    for index in (token_index, gram_index):
+        for block in index.values():
+            if 1 < len(block) <= max_block:
+                for x in range(len(block)):
+                    for y in range(x + 1, len(block)):
+                        candidates.add((block[x], block[y]))
+
+    def plausible(a, b):
+        # same name tokens (any order), one token plus a close spelling, or enough trigrams in common
+        shared = len(a['tokens'] & b['tokens'])
+        if shared >= min(2, len(a['tokens']), len(b['tokens'])):
+            return True
+        if shared and SequenceMatcher(None, a['key'], b['key']).ratio() >= threshold:
+            return True
+        return len(a['grams'] & b['grams']) >= GRAM_OVERLAP * max(len(a['grams']), len(b['grams']))
+
+    candidates = [(i, j) for i, j in candidates if plausible(recs[i], recs[j])]
+
+    # union-find over pairs above the threshold
+    parent = list(range(len(recs)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in candidates:
+        if _pair_score(recs[i], recs[j]) >= threshold:
+            parent[find(i)] = find(j)
+
+    groups = defaultdict(list)
+    for i in range(len(recs)):
+        groups[find(i)].append(recs[i]['user'])
+    dups = {}
+    for members in groups.values():
+        if len(members) > 1:
+            dups[members[0].get('displayName')] = members
+    return dups
+
+
+# Above this many accounts --listGroups builds the group index instead of one request per account
+LIST_GROUPS_INDEX_MIN = 5
+
+
 # Helper: print groups for an account id (no-frills)
-def print_groups_for_account(config: Dict, account_id: str) -> None:
-    groups = list_user_groups(config, account_id)
+def print_groups_for_account(config: Dict, account_id: str, index: Dict = None) -> None:
+    if index is not None:
+        groups = indexed_user_groups(index, account_id)
+    else:
+        groups = list_user_groups(config, account_id)
     if not groups:
         print(f'No groups found for accountId {account_id}')
         return
@@ -95,19 +269,20 @@ def print_duplicates(dups: Dict) -> None:
                 display = u.get('displayName') or ''
                 aid = u.get('accountId') or ''
                 email = u.get('emailAddress') or ''
-                print(f"  - {display} | {aid} | {email}")
-
+                inactive = ' (inactive)' if u.get('active') is False else ''
+                print(f"  - {display} | {aid} | {email}{inactive}")
 
-def main(argv=None):
-    if argv is None:
-        argv = sys.argv[1:]
 
+def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description='Atlassian admin helpers')
     p.add_argument('--dups', action='store_true', help='Find duplicate users by displayName and similar-name pairs')
+    p.add_argument('--fuzzy', action='store_true', help='With --dups: fuzzy match names (nicknames, reordering, typos) including inactive accounts')
+    p.add_argument('--fuzzy-threshold', type=float, default=0.85, help='Score needed for a --fuzzy match (0-1, default: 0.85)')
     p.add_argument('-a', '--ask', action='store_true', help='Prompt for password / API token')
     p.add_argument('-u', '--uname', help='Username for keyring lookup (email)')
     p.add_argument('-p', '--passwd', help='Password / API token (optional)')
     p.add_argument('--listGroups', nargs='+', help='Print groups for one or more user accountIds (space-separated)')
+    p.add_argument('--refreshGroups', action='store_true', help='Rebuild the cached group membership index before --listGroups/--copyGroups')
     p.add_argument('--copyGroups', nargs=2, metavar=('SRC','DST'), help='Copy all groups from SRC accountId to DST accountId')
     p.add_argument('--dry-run', action='store_true', help='Show what would be done for --copyGroups without making changes')
     p.add_argument('--findAccount', help='Find account ids for users whose displayName starts with the given prefix')
@@ -128,6 +303,9 @@ def main(argv=None):
     p.add_argument('--srcUsername', help='Username for SRC personal space lookup (e.g., ykang)')
     p.add_argument('--dstUsername', help='Username for DST personal space lookup')
     p.add_argument('--moveuser', nargs=2, metavar=('SRC','DST'), help=' Copy groups, reassign tickets and copy watcher from  DST accountId to SRC accountId')
+    p.add_argument('--async', dest='async_limit', nargs='?', type=int, const=ASYNC_LIMIT, metavar='N',
+                   help=f'Run bulk Jira updates (watchers, reassign, reviewer, filters, groups) on asyncio '
+                        f'with up to N requests in flight (default N: {ASYNC_LIMIT}; needs httpx)')
     p.add_argument('--predicate', help=' partial predicate to pass to jira  like "and project=SE"')
     p.add_argument('--spaces', nargs='+', help='Space names for --processConfluence or --moveuser (e.g., DM EPO LSSTOps). Omit to scan all spaces.')
     p.add_argument('--pageid', help='Process a single Confluence page by ID (use with --processConfluence)')
@@ -136,24 +314,62 @@ def main(argv=None):
     p.add_argument('--list-personal-pages', metavar='ACCOUNT', help='List all pages in a personal space (account ID, username, or space URL)')
     p.add_argument('--list-space', metavar='SPACE', help='List all pages in a space (space key like "LSSTOps" or space URL)')
     p.add_argument('--list-spaces', action='store_true', help='List all Confluence spaces (excludes personal spaces)')
+    p.add_argument('--refresh-spaces', action='store_true', help='Rebuild the cached index of personal spaces by owner accountId')
     p.add_argument('--replace-text', action='store_true', help='Search and replace text in Confluence pages (requires --search-string and --replace-string)')
+    p.add_argument('--mirror', nargs='+', metavar='SPACE', help='Copy (or refresh) the storage bodies of the given spaces into the local mirror database')
+    p.add_argument('--mirror-db', default=MIRROR_DB, help=f'Local mirror database for --mirror/--use-mirror (default: {MIRROR_DB})')
+    p.add_argument('--use-mirror', action='store_true', help='With --replace-text: find pages in the local mirror (exact match) instead of CQL')
     p.add_argument('--search-string', help='String to search for in Confluence pages')
     p.add_argument('--replace-string', help='String to replace the search string with')
-    p.add_argument('--replace-user', nargs=2, metavar=('SRC', 'DST'), help='Replace user mentions/assignments from SRC account ID to DST account ID')
+    p.add_argument('--replace-user', nargs='+', metavar='SRC DST', help='Replace user mentions/assignments from SRC account ID to DST account ID (several SRC DST pairs are replaced in one pass)')
+    p.add_argument('--full-scan', action='store_true', help='With --replace-user: check every page in the space instead of only pages Confluence finds mentioning SRC')
+    p.add_argument('--delta', action='store_true', help='With --processConfluence/--replace-user/--moveuser: only pages changed since the last complete run for the same SRC/DST, plus the pages that failed then')
     p.add_argument('--confirm', action='store_true', help='Prompt for confirmation before each page update')
-
-    args = p.parse_args(argv)
-    # reuse existing helper to build login config
-    config = get_login_config(args)
-
+    p.add_argument('--batch', metavar='PLAN', help='Run the operations listed in a YAML plan file in one process (see run_batch)')
+    p.add_argument('--record', metavar='CASSETTE', help='Record all HTTP responses of this run to CASSETTE (.jsonl or .jsonl.gz)')
+    p.add_argument('--replay', metavar='CASSETTE', help='Serve HTTP responses from a recorded CASSETTE instead of the network (no login needed)')
+    p.add_argument('--replay-latency', type=float, default=0.0, metavar='FACTOR',
+                   help='With --replay: sleep FACTOR times each recorded response time (1 = as recorded, default: 0)')
+    p.add_argument('--no-memo', action='store_true', help='Do not reuse responses of identical GET requests within the run')
+    return p
+
+
+def start_cassette(args) -> Dict:
+    """Apply --record/--replay; returns the login config to use (a dummy one when replaying)."""
+    if getattr(args, 'record', None) and getattr(args, 'replay', None):
+        raise SystemExit('FAILED --record and --replay cannot be combined')
+    if getattr(args, 'replay', None):
+        use_cassette(args.replay, 'replay', latency=args.replay_latency)
+        return {'user': args.uname or 'replay', 'password': 'replay', 'url': EP}
+    if getattr(args, 'record', None):
+        use_cassette(args.record, 'record')
+    return get_login_config(args)
+
+
+def run_actions(args, config: Dict) -> bool:
+    """Run every operation requested in args. Returns True if any operation ran."""
     ok = False
     acct = args.listGroups
     pred = args.predicate
+    alimit = getattr(args, 'async_limit', None) or 0
+    if alimit and active_cassette() is not None:
+        print('--async requests bypass the cassette; running bulk updates threaded instead')
+        alimit = 0
+    if getattr(args, 'refreshGroups', False):
+        build_group_index(config, refresh=True)
+        ok = True
+    if getattr(args, 'refresh_spaces', False):
+        build_personal_space_index(get_confluence_client(config), refresh=True)
+        ok = True
+
     # if an account id was requested, list groups and exit
     if acct:
         # acct may be a list of account ids; iterate and print groups for each
+        index = None
+        if len(acct) >= LIST_GROUPS_INDEX_MIN or getattr(args, 'refreshGroups', False):
+            index = build_group_index(config)
         for aid in acct:
-            print_groups_for_account(config, aid)
+            print_groups_for_account(config, aid, index=index)
         ok = True
 
     # find account(s) by display-name prefix
@@ -169,7 +385,7 @@ def main(argv=None):
     # copy groups operation
     if getattr(args, 'copyGroups', None):
         src, dst = args.copyGroups
-        copy_groups(config, src, dst, dry_run=bool(getattr(args, 'dry_run', False)))
+        copy_groups(config, src, dst, dry_run=bool(getattr(args, 'dry_run', False)), async_limit=alimit)
         ok = True
 
     # print counts of issues assigned to account(s)
@@ -208,14 +424,15 @@ def main(argv=None):
             'confluence_moved': 0,
         }
         
-        copy_groups(config, src, dst, dry_run=dry_run)
-        summary['filters_shared'] = share_all_filters(jira, src, dst, dry_run=dry_run)
+        copy_groups(config, src, dst, dry_run=dry_run, async_limit=alimit)
+        summary['filters_shared'] = share_all_filters(jira, src, dst, dry_run=dry_run, async_limit=alimit)
         copied, _ = transfer_user_dashboards(jira, src, dst, dry_run=dry_run)
         summary['dashboards_copied'] = copied
-        summary['watched'] = copy_watcher(config, src, dst, pred)
+        summary['watched'] = copy_watcher(config, src, dst, pred, async_limit=alimit)
         summary['reporter_changed'] = copy_reporter(config, src, dst, dry_run, pred)
-        summary['reviewer_changed'] = copy_reviewer(config, src, dst, dry_run, pred, getattr(args, 'reviewerField', 'Reviewer'))
-        summary['reassigned'] = reassign(config, src, dst, dry_run, pred)
+        summary['reviewer_changed'] = copy_reviewer(config, src, dst, dry_run, pred, getattr(args, 'reviewerField', 'Reviewer'),
+                                                    async_limit=alimit)
+        summary['reassigned'] = reassign(config, src, dst, dry_run, pred, async_limit=alimit)
         confluence = get_confluence_client(config)
         # Transfer personal space ownership and move pages
         success, msg, ps_counts = transfer_personal_space(
@@ -232,7 +449,8 @@ def main(argv=None):
         summary['confluence_owner'] += ps_counts[2]
         summary['confluence_moved'] = ps_counts[3]
         
-        totals = process_spaces(config, confluence, args.spaces, src, dst, limit=500, dry_run=dry_run)
+        totals = process_spaces(config, confluence, args.spaces, src, dst, limit=500, dry_run=dry_run,
+                                delta=getattr(args, 'delta', False))
         summary['confluence_edit'] += totals['edit']
         summary['confluence_watch'] += totals['watch']
         summary['confluence_owner'] += totals['owner']
@@ -257,13 +475,13 @@ def main(argv=None):
 
     if getattr(args, 'reassign', None):
         src, dst = args.reassign
-        reassign(config, src, dst, (getattr(args, 'dry_run', False)), pred)
+        reassign(config, src, dst, (getattr(args, 'dry_run', False)), pred, async_limit=alimit)
         ok = True
 
     # copy watcher operation
     if getattr(args, 'copyWatcher', None):
         src, dst = args.copyWatcher
-        copy_watcher(config, src, dst, pred)
+        copy_watcher(config, src, dst, pred, async_limit=alimit)
         ok = True
 
     # copy reporter operation
@@ -286,13 +504,13 @@ def main(argv=None):
     if getattr(args, 'assignReviewer', None):
         src, dst = args.assignReviewer
         field_name = getattr(args, 'reviewerField', 'Reviewer')
-        copy_reviewer(config, src, dst, getattr(args, 'dry_run', False), pred, field_name)
+        copy_reviewer(config, src, dst, getattr(args, 'dry_run', False), pred, field_name, async_limit=alimit)
         ok = True
 
     if getattr(args, 'transferFilters', None):
         src, dst = args.transferFilters
         jira = get_jira_from_config(config)
-        share_all_filters(jira, src, dst, dry_run=getattr(args, 'dry_run', False))
+        share_all_filters(jira, src, dst, dry_run=getattr(args, 'dry_run', False), async_limit=alimit)
         ok = True
 
     if getattr(args, 'transferDashboards', None):
@@ -408,6 +626,12 @@ def main(argv=None):
                 print(f"{key:<20} {space_type:<15} {name}")
         ok = True
 
+    if getattr(args, 'mirror', None):
+        confluence = get_confluence_client(config)
+        for space_key in args.mirror:
+            mirror_space(confluence, space_key, path=args.mirror_db)
+        ok = True
+
     if getattr(args, 'replace_text', None):
         if not args.search_string:
             print("Error: --replace-text requires --search-string")
@@ -436,12 +660,18 @@ def main(argv=None):
             modified = replace_pages(config, args.search_string, args.replace_string,
                                      space=space_key,
                                      dry_run=dry_run,
-                                     confirm_per_page=confirm)
+                                     confirm_per_page=confirm,
+                                     mirror_db=args.mirror_db if getattr(args, 'use_mirror', None) else None)
             print(f"Pages matched/modified: {len(modified)}")
         ok = True
 
     if getattr(args, 'replace_user', None):
-        src_id, dst_id = args.replace_user
+        if len(args.replace_user) % 2:
+            print("Error: --replace-user takes SRC DST pairs")
+            sys.exit(1)
+        pairs = list(zip(args.replace_user[::2], args.replace_user[1::2]))
+        src_id, dst_id = pairs[0]
+        mapping = dict(pairs)
         confluence = get_confluence_client(config)
         dry_run = getattr(args, 'dry_run', False)
         confirm = getattr(args, 'confirm', False)
@@ -449,7 +679,8 @@ def main(argv=None):
         space_key = space[0] if space else None
         page_url = getattr(args, 'page_url', None)
         
-        print(f"Replacing user mentions from {src_id} to {dst_id}...")
+        for old, new in pairs:
+            print(f"Replacing user mentions from {old} to {new}...")
         if dry_run:
             print("  (dry-run mode)")
         
@@ -457,7 +688,7 @@ def main(argv=None):
             # Single page mode
             page_id = extract_page_id_from_url(page_url)
             if page_id:
-                if replace_user_in_page(confluence, page_id, src_id, dst_id, dry_run=dry_run):
+                if replace_user_in_page(confluence, page_id, src_id, dst_id, dry_run=dry_run, mapping=mapping):
                     print("Pages with user mentions replaced: 1")
                 else:
                     print("Pages with user mentions replaced: 0")
@@ -468,7 +699,9 @@ def main(argv=None):
                 sys.exit(1)
             
             modified = replace_user_in_space(confluence, space_key, src_id, dst_id, 
-                                              dry_run=dry_run, confirm=confirm)
+                                              dry_run=dry_run, confirm=confirm,
+                                              full_scan=getattr(args, 'full_scan', False),
+                                              delta=getattr(args, 'delta', False), mapping=mapping)
             print(f"Pages with user mentions replaced: {len(modified)}")
         ok = True
 
@@ -488,18 +721,146 @@ def main(argv=None):
             process_single_page(config, confluence, page_id, src, dst, dry_run=dry_run)
         else:
             # Process spaces
-            process_spaces(config, confluence, args.spaces, src, dst, limit=500, dry_run=dry_run)
+            process_spaces(config, confluence, args.spaces, src, dst, limit=500, dry_run=dry_run,
+                           delta=getattr(args, 'delta', False))
         ok = True
 
     if getattr(args, 'dups', None):
         print('Fetching users from Atlassian...')
-        users = get_all_atlassian_users(config)
+        fuzzy = getattr(args, 'fuzzy', False)
+        users = get_all_atlassian_users(config, include_inactive=fuzzy)
         print(f'Got {len(users)} users')
-        dups = find_duplicate_displayname_users(users)
+        if fuzzy:
+            dups = find_fuzzy_duplicate_users(users, threshold=args.fuzzy_threshold)
+        else:
+            dups = find_duplicate_displayname_users(users)
         # print duplicates via helper and exit
         print_duplicates(dups)
         ok = True
 
+    return ok
+
+
+def _plan_step_argv(step: Dict, options: Dict) -> List[str]:
+    """Turn one plan step into the command line it stands for.
+
+    The first key is the operation (an opsAdmin option name without the dashes),
+    its value the operation arguments. Remaining keys, then the plan-wide
+    options, are extra options: a list gives several values, true a flag.
+    """
+    argv = []
+    for key, value in list(step.items()) + [(k, v) for k, v in options.items() if k not in step]:
+        opt = '--' + key.replace('_', '-')
+        if value is True:
+            argv.append(opt)
+        elif value is False or value is None:
+            continue
+        elif isinstance(value, (list, tuple)):
+            argv.append(opt)
+            argv.extend(str(v) for v in value)
+        else:
+            argv.extend([opt, str(value)])
+    return argv
+
+
+def run_batch(plan_file: str, config: Dict, parser: argparse.ArgumentParser) -> int:
+    """Run a YAML plan of opsAdmin operations in one process.
+
+    One login, one Jira/Confluence client, one user directory and one field list
+    are shared by every step. A plan looks like:
+
+      options:            # applied to every step (optional)
+        dry_run: true
+        predicate: "and project = SE"
+      continue_on_error: false
+      steps:
+        - copyGroups: [SRC, DST]
+        - parallel:       # independent steps, run concurrently
+            - transferFilters: [SRC, DST]
+            - transferDashboards: [SRC, DST]
+            - reassign: [SRC, DST]
+        - processConfluence: [SRC, DST]
+          spaces: [DM, LSSTOps]
+
+    Every step is parsed up front so a typo fails before anything changes.
+    Returns a process exit code.
+    """
+    import yaml
+    from concurrent.futures import ThreadPoolExecutor
+
+    with open(plan_file) as f:
+        plan = yaml.safe_load(f) or {}
+    options = plan.get('options') or {}
+    continue_on_error = bool(plan.get('continue_on_error', False))
+
+    def parse(step):
+        if not isinstance(step, dict) or not step:
+            raise ValueError(f'plan step must be a mapping: {step!r}')
+        argv = _plan_step_argv(step, options)
+        try:
+            return ' '.join(argv), parser.parse_args(argv)
+        except SystemExit:
+            raise ValueError(f'invalid plan step: {step!r}')
+
+    stages = []
+    try:
+        for step in plan.get('steps') or []:
+            if isinstance(step, dict) and 'parallel' in step:
+                stages.append([parse(s) for s in step['parallel']])
+            else:
+                stages.append([parse(step)])
+    except ValueError as e:
+        print(f'ERROR: {e}')
+        return 2
+
+    def run(label_args):
+        label, step_args = label_args
+        print(f'\n>>> {label}')
+        try:
+            if not run_actions(step_args, config):
+                return f'{label}: no operation'
+        except SystemExit as e:
+            if e.code:
+                return f'{label}: exited with {e.code}'
+        except Exception as e:
+            return f'{label}: {e}'
+        return None
+
+    failed = []
+    for n, stage in enumerate(stages, 1):
+        print(f'\n=== Plan stage {n}/{len(stages)} ({len(stage)} step(s)) ===')
+        if len(stage) == 1:
+            errors = [run(stage[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(stage), MAX_WORKERS)) as pool:
+                errors = list(pool.map(run, stage))
+        errors = [e for e in errors if e]
+        for e in errors:
+            print(f'FAILED: {e}')
+        failed.extend(errors)
+        if errors and not continue_on_error:
+            print('Stopping plan (set continue_on_error: true to carry on)')
+            break
+    print(f'\nPlan finished: {len(stages)} stage(s), {len(failed)} failure(s)')
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    p = build_parser()
+    args = p.parse_args(argv)
+    # reuse existing helper to build login config (not needed when replaying a cassette)
+    config = start_cassette(args)
+    if args.no_memo:
+        use_memo(False)
+
+    if getattr(args, 'batch', None):
+        return run_batch(args.batch, config, p)
+
+    ok = run_actions(args, config)
+
     # if no action ran, show help (preserve old style)
     if not ok:
         p.print_help()
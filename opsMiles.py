@@ -4,6 +4,7 @@ import io
 import sys
 from datetime import datetime
 
+from opsMiles.clients import use_cassette
 from opsMiles.ojira import set_jira_due_date, get_jira, list_jira_issues
 from opsMiles.ojira import list_milestones, get_last_comment, get_login_config
 from opsMiles.orst import jordoc
@@ -238,6 +239,13 @@ if __name__ == '__main__':
     parser.add_argument('-q', '--query', default=pred,
                         help=""" Partial predicate for milestones like 
                         'component = Data Management' """)
+    parser.add_argument('--record', metavar='CASSETTE',
+                        help="""Record the Jira responses of this run to CASSETTE""")
+    parser.add_argument('--replay', metavar='CASSETTE',
+                        help="""Replay a recorded CASSETTE instead of calling Jira""")
+    parser.add_argument('--replay-latency', type=float, default=0.0,
+                        help="""With --replay sleep this factor times the recorded
+                        response times (default 0)""")
     parser.add_argument('-r', '--report', action='store_true',
                         help="""Just report dont update anything.""")
     parser.add_argument('-s', '--split', action='store_true',
@@ -252,8 +260,14 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
     user = args.uname
-
-    user, pw, jira = get_jira(user, args.ask, args.passwd)
+    passwd = args.passwd
+    if args.record:
+        use_cassette(args.record, 'record')
+    if args.replay:
+        use_cassette(args.replay, 'replay', latency=args.replay_latency)
+        passwd = 'replay'
+
+    user, pw, jira = get_jira(user, args.ask, passwd)
 
     if args.gantt:
         fname="USDFplan.tex"
@@ -0,0 +1,180 @@
+"""
+Asyncio Jira REST client for the bulk opsAdmin operations.
+
+The offboarding operations (add watcher, reassign, change reviewer, share filter,
+add to group) are almost entirely network wait, so instead of one blocking request
+at a time they can be issued from a single event loop with many requests in
+flight. AsyncJira mirrors the blocking helpers in opsMiles.ojira (same return
+values) and run_bulk drives them with a semaphore bound, printing results in
+input order and returning them so callers can build their usual `problem` lists.
+
+Requires httpx (pip install httpx); it is only imported when an async mode is used.
+"""
+
+import asyncio
+import random
+
+from opsMiles.transport import retry_after_seconds, should_retry
+
+# Requests in flight at once for async bulk operations (opsAdmin --async)
+ASYNC_LIMIT = 32
+
+
+class AsyncJira:
+    """Minimal async Jira Cloud REST client (basic auth, 429/503 aware)."""
+
+    def __init__(self, config: dict, limit: int = ASYNC_LIMIT, max_retries: int = 8):
+        import httpx
+
+        self.server_url = config.get('url').rstrip('/')
+        self.max_retries = max_retries
+        self.client = httpx.AsyncClient(
+            base_url=self.server_url,
+            auth=(config.get('user'), config.get('password')),
+            headers={'Accept': 'application/json'},
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            timeout=httpx.Timeout(60.0),
+        )
+        self._paused_until = 0.0
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def request(self, method: str, path: str, **kwargs):
+        """Send a request, waiting out Retry-After (plus jitter) on throttling."""
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            # a throttle seen by any request pauses every request on this client
+            delay = self._paused_until - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            r = await self.client.request(method, path, **kwargs)
+            if not should_retry(method, r.status_code) or attempt >= self.max_retries:
+                return r
+            hint = retry_after_seconds(r.headers)
+            wait = random.uniform(0, min(60.0, 2 ** attempt)) + (hint or 0)
+            self._paused_until = max(self._paused_until, loop.time() + wait)
+            attempt += 1
+
+    @staticmethod
+    def _error(r) -> str:
+        try:
+            body = r.json()
+            errors = body.get('errors', {})
+            err = body.get('errorMessages', [r.text])
+            if errors:
+                return str(errors)
+            if err:
+                return '; '.join(err) if isinstance(err, list) else str(err)
+        except Exception:
+            pass
+        return f'{r.status_code}: {r.text}'
+
+    async def add_watcher(self, account_id: str, issue: str) -> str:
+        """Add a watcher to an issue. Returns 'added' or an error string."""
+        r = await self.request('POST', f'/rest/api/3/issue/{issue}/watchers',
+                               params={'notifyUsers': 'false'}, json=account_id)
+        if r.status_code == 204:
+            return 'added'
+        return f'error:{r.status_code} {r.text}'
+
+    async def assign_issue_quiet(self, issue_key: str, account_id: str) -> bool:
+        """Assign issue without sending notification."""
+        r = await self.request('PUT', f'/rest/api/3/issue/{issue_key}', params={'notifyUsers': 'false'},
+                               json={'fields': {'assignee': {'accountId': account_id}}})
+        return r.status_code == 204
+
+    async def change_reviewer_quiet(self, issue_key: str, account_id: str, field_id: str) -> tuple:
+        """Change reviewer on issue without sending notification. Returns (success, error_msg)."""
+        if not field_id:
+            return False, "Reviewer field ID not found"
+        r = await self.request('PUT', f'/rest/api/3/issue/{issue_key}', params={'notifyUsers': 'false'},
+                               json={'fields': {field_id: [{'accountId': account_id}]}})
+        if r.status_code in (200, 204):
+            return True, None
+        return False, self._error(r)
+
+    async def share_filter(self, filter_id, account_id: str, share_permissions: list = None) -> tuple:
+        """Change filter owner and grant edit, as ojira.share_filter. Returns (owner_changed, message)."""
+        messages = []
+        r = await self.request('PUT', f'/rest/api/3/filter/{filter_id}/owner', json={'accountId': account_id})
+        owner_success = r.status_code in (200, 204)
+        messages.append("owner changed" if owner_success else f"owner change failed: {self._error(r)}")
+
+        perms = share_permissions
+        if perms is None:
+            r = await self.request('GET', f'/rest/api/3/filter/{filter_id}/permission')
+            perms = r.json() if r.status_code == 200 else []
+        for p in perms:
+            ptype = p.get('type', '')
+            if ptype in ('loggedin', 'global'):
+                messages.append(f"already shared with {ptype}")
+                break
+            if ptype == 'user' and p.get('user', {}).get('accountId') == account_id:
+                messages.append("already shared with user")
+                break
+        else:
+            r = await self.request('POST', f'/rest/api/3/filter/{filter_id}/permission',
+                                   json={'type': 'user', 'accountId': account_id, 'rights': 'EDIT'})
+            if r.status_code in (200, 201):
+                messages.append("edit permission granted")
+            else:
+                messages.append(f"share failed: {self._error(r)}")
+        return owner_success, "; ".join(messages)
+
+    async def add_user_to_group(self, account_id: str, group_name: str) -> str:
+        """Add a user to a group. Returns 'added', 'exists', or error string."""
+        r = await self.request('POST', '/rest/api/3/group/user', params={'groupname': group_name},
+                               json={'accountId': account_id})
+        if r.status_code == 201:
+            return 'added'
+        if r.status_code == 409:
+            return 'exists'
+        return f'error:{r.status_code} {r.text}'
+
+
+async def gather_bounded(items: list, worker, limit: int = ASYNC_LIMIT, report=None) -> list:
+    """Run worker(item) for every item with at most limit in flight.
+
+    Results (or the exception raised) are returned in input order, and report(index,
+    item, result) is called in input order as soon as each prefix is complete, so
+    progress output reads exactly like the sequential loops.
+    """
+    sem = asyncio.Semaphore(limit)
+
+    async def one(i, item):
+        async with sem:
+            try:
+                return i, await worker(item)
+            except Exception as e:
+                return i, e
+
+    results = [None] * len(items)
+    done = [False] * len(items)
+    next_report = 0
+    for fut in asyncio.as_completed([one(i, item) for i, item in enumerate(items)]):
+        i, res = await fut
+        results[i] = res
+        done[i] = True
+        while next_report < len(items) and done[next_report]:
+            if report:
+                report(next_report, items[next_report], results[next_report])
+            next_report += 1
+    return results
+
+
+def run_bulk(config: dict, operation: str, arg_list: list, limit: int = ASYNC_LIMIT, report=None) -> list:
+    """Call AsyncJira.<operation>(*args) for every args tuple in arg_list; blocking wrapper.
+
+    Returns the per-item results in order (exceptions are returned, not raised).
+    """
+    async def main():
+        jira = AsyncJira(config, limit=limit)
+        try:
+            method = getattr(jira, operation)
+            return await gather_bounded(arg_list, lambda args: method(*args), limit=limit, report=report)
+        finally:
+            await jira.close()
+
+    return asyncio.run(main())
@@ -0,0 +1,162 @@
+"""
+Record and replay of Atlassian HTTP traffic ("cassettes").
+
+With a cassette in record mode every response that passes through the shared
+transport (opsMiles.transport.RateLimitedAdapter) is appended to a JSON lines file,
+optionally gzipped (name ending in .gz). In replay mode the same adapter serves
+the recorded responses instead of touching the network, so an opsMiles.py or
+opsAdmin.py run can be repeated offline, deterministically, for benchmarking and
+profiling. Replay can also sleep for the recorded latency of each response.
+
+Requests are matched on method, URL (query parameters sorted) and a hash of the
+body; repeated identical requests are served in recorded order, and if the body
+differs the first unused response for the same method and URL is used.
+Only the final response of a request is recorded (throttled attempts are not) and
+request headers, including credentials, are never written.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from requests import Response
+from requests.exceptions import ConnectionError
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from opsMiles.transport import normalize_url
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+# response headers worth keeping; the rest only bloat the cassette
+KEEP_HEADERS = ('content-type', 'location', 'retry-after', 'x-ratelimit-nearlimit', 'x-ratelimit-reset')
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def body_hash(body) -> str:
+    if not body:
+        return ''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if not isinstance(body, bytes):
+        # streamed/file bodies cannot be hashed without consuming them
+        return ''
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+class Cassette:
+    """A recording (mode RECORD) or recorded session being played back (mode REPLAY)."""
+
+    def __init__(self, path: str, mode: str = REPLAY, latency: float = 0.0):
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.count = 0
+        self.missed = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._exact = defaultdict(deque)
+        self._loose = defaultdict(deque)
+        if mode == RECORD:
+            self._file = _open(path, 'w')
+        else:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _load(self):
+        with _open(self.path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                entry['used'] = False
+                self._exact[(entry['method'], entry['url'], entry['body'])].append(entry)
+                self._loose[(entry['method'], entry['url'])].append(entry)
+
+    def record(self, request, response) -> None:
+        """Append the final response for request to the cassette."""
+        content = response.content or b''
+        try:
+            text, encoding = content.decode('utf-8'), None
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(content).decode('ascii'), 'base64'
+        entry = {
+            'method': request.method,
+            'url': normalize_url(request.url),
+            'body': body_hash(request.body),
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() in KEEP_HEADERS},
+            'elapsed': round(response.elapsed.total_seconds(), 4),
+            'content': text,
+        }
+        if encoding:
+            entry['encoding'] = encoding
+        line = json.dumps(entry, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self.count += 1
+
+    def _next(self, request) -> dict:
+        method, url = request.method, normalize_url(request.url)
+        with self._lock:
+            for queue in (self._exact[(method, url, body_hash(request.body))], self._loose[(method, url)]):
+                while queue and queue[0]['used']:
+                    queue.popleft()
+                if queue:
+                    entry = queue[0]
+                    # keep the last response for a request around for any extra repeats
+                    if len(queue) > 1:
+                        entry['used'] = True
+                        queue.popleft()
+                    self.count += 1
+                    return entry
+            self.missed += 1
+        return None
+
+    def play(self, request, adapter=None) -> Response:
+        """The recorded response for request; raises ConnectionError if none was recorded."""
+        entry = self._next(request)
+        if entry is None:
+            raise ConnectionError(f"No recorded response for {request.method} {request.url} in {self.path}",
+                                  request=request)
+        if self.latency:
+            time.sleep(entry['elapsed'] * self.latency)
+        response = Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        if entry.get('encoding') == 'base64':
+            response._content = base64.b64decode(entry['content'])
+        else:
+            response._content = entry['content'].encode('utf-8')
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=entry['elapsed'])
+        response.connection = adapter
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+                print(f"Recorded {self.count} responses to {self.path}")
+            elif self.replaying:
+                print(f"Replayed {self.count} responses from {self.path}"
+                      + (f", {self.missed} requests not recorded" if self.missed else ""))
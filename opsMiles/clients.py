@@ -0,0 +1,154 @@
+"""
+Process-wide registry of authenticated Atlassian clients.
+
+Every Jira, Confluence and plain REST session for a site is handed out once and
+shares one pooled, rate limited adapter (opsMiles.transport), so a whole opsAdmin
+run (or --batch plan) costs a single TLS handshake per pooled connection and a
+single myself() auth probe.
+The pool is sized for the thread pools used by the bulk operations.
+use_cassette() points every pool at a record/replay cassette (opsMiles.cassette);
+each pool also memoizes identical GETs for the run unless use_memo(False) is called.
+"""
+
+import threading
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+from opsMiles.transport import RateLimitedAdapter, RateLimiter, ResponseMemo
+
+# Concurrent requests used by the bulk admin operations
+MAX_WORKERS = 8
+
+# Connections kept per host; leaves room for nested pools (e.g. batch steps running concurrently)
+POOL_SIZE = MAX_WORKERS * 2
+
+_lock = threading.RLock()
+_adapters = {}
+_jira = {}
+_confluence = {}
+_http = {}
+_cassette = None
+_memo = True
+
+
+def site_adapter(url: str) -> RateLimitedAdapter:
+    """The shared, rate limited connection pool for a site."""
+    with _lock:
+        if url not in _adapters:
+            limiter = RateLimiter(concurrency=MAX_WORKERS, max_concurrency=POOL_SIZE)
+            _adapters[url] = RateLimitedAdapter(limiter, pool_connections=4, pool_maxsize=POOL_SIZE)
+            _adapters[url].cassette = _cassette
+            _adapters[url].memo = ResponseMemo() if _memo else None
+        return _adapters[url]
+
+
+def mount_site(session: requests.Session, url: str) -> requests.Session:
+    """Route all requests from session through the site's shared pool."""
+    adapter = site_adapter(url)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def use_cassette(path: str, mode: str, latency: float = 0.0):
+    """Record all traffic to, or replay it from, the cassette file at path.
+
+    mode is 'record' or 'replay'; latency scales the recorded response times slept
+    during replay (0 replays as fast as possible). The cassette is closed at exit.
+    """
+    global _cassette
+    import atexit
+    from opsMiles.cassette import Cassette
+
+    with _lock:
+        if _cassette is not None:
+            _cassette.close()
+        _cassette = Cassette(path, mode, latency=latency)
+        for adapter in _adapters.values():
+            adapter.cassette = _cassette
+        atexit.register(_cassette.close)
+        return _cassette
+
+
+def use_memo(enabled: bool = True) -> None:
+    """Turn the per-run GET memo on or off for every site pool."""
+    global _memo
+    with _lock:
+        _memo = enabled
+        for adapter in _adapters.values():
+            adapter.memo = ResponseMemo() if enabled else None
+
+
+def active_cassette():
+    """The cassette set by use_cassette, or None."""
+    return _cassette
+
+
+def jira_client(config: dict):
+    """Authenticated JIRA client for config['url'], created and probed once."""
+    from jira import JIRA
+
+    url = config.get('url')
+    key = (url, config.get('user'))
+    with _lock:
+        if key not in _jira:
+            # no requests in the constructor: serverInfo must go through the mounted (replayable) pool
+            # a response missing from a replayed cassette will not turn up on retry
+            retries = 0 if _cassette is not None and _cassette.replaying else 3
+            jira = JIRA(server=url, basic_auth=(config.get('user'), config.get('password')),
+                        get_server_info=False, options={'check_update': False}, max_retries=retries)
+            mount_site(jira._session, url)
+            try:
+                info = jira.server_info()
+                jira._version = tuple(info['versionNumbers'])
+                jira.deploymentType = info.get('deploymentType')
+                jira.myself()
+            except Exception as e:
+                raise Exception(f"Authentication failed for user '{config.get('user')}': {e}")
+            _jira[key] = jira
+        return _jira[key]
+
+
+def confluence_client(config: dict):
+    """Confluence client for config['url'], created once.
+
+    Always adds the Atl-Confluence-With-Admin-Key header to bypass page restrictions
+    (requires Confluence Cloud Premium/Enterprise and site admin).
+    """
+    from atlassian import Confluence
+
+    url = config.get('url')
+    key = (url, config.get('user'))
+    with _lock:
+        if key not in _confluence:
+            session = mount_site(requests.Session(), url)
+            session.headers.update({
+                'Atl-Confluence-With-Admin-Key': 'true'
+            })
+            _confluence[key] = Confluence(url=url, username=config.get('user'),
+                                          password=config.get('password'), session=session)
+        return _confluence[key]
+
+
+def http_session(config: dict) -> requests.Session:
+    """Plain requests session with basic auth for direct REST calls to config['url']."""
+    url = config.get('url')
+    key = (url, config.get('user'))
+    with _lock:
+        if key not in _http:
+            session = mount_site(requests.Session(), url)
+            session.auth = HTTPBasicAuth(config.get('user'), config.get('password'))
+            _http[key] = session
+        return _http[key]
+
+
+def reset() -> None:
+    """Forget every client and pool (e.g. after a credential change)."""
+    with _lock:
+        for adapter in _adapters.values():
+            adapter.close()
+        _adapters.clear()
+        _jira.clear()
+        _confluence.clear()
+        _http.clear()
@@ -10,116 +10,181 @@ Notes:
 - For Atlassian Cloud, the password should be an API token.
 """
 
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+import queue
 import re
+import hashlib
 import html
+import json
 import sys
+import threading
+import time
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from urllib.parse import quote
 from atlassian import Confluence
 
+from opsMiles.clients import MAX_WORKERS, confluence_client
+from opsMiles.ocache import drop_cache, load_cache, save_cache
+from opsMiles.transport import NO_MEMO_HEADER
+
+# Results requested per CQL search page (the server may return fewer)
+CQL_PAGE_SIZE = 100
+
+# CQL expansion that returns each page with the storage body and version used for updates
+PAGE_EXPAND = 'content.body.storage,content.version'
+
+# Spaces processed at once by process_spaces when scanning the whole site
+SPACE_WORKERS = 4
+
+# Seconds between polls of a long-running task (hierarchy copy), and how long to wait for one
+LONGTASK_POLL = 2.0
+LONGTASK_TIMEOUT = 3600
+
+# Seconds the personal space index (space key -> space) is reused from the file cache
+PERSONAL_SPACE_TTL = 86400
+
+# Personal space keys made from an accountId (~ and the id without ':' and '-')
+PERSONAL_KEY_PATTERN = re.compile(r'~[0-9a-f]{24,}')
+_personal_spaces = {}
+
+# build_user_relations results per (site, accountId), reused for the whole run
+_user_relations = {}
+_user_relations_lock = threading.Lock()
+
 def get_confluence_client(config: dict) -> Confluence:
-    """Create a Confluence client from login config dict.
+    """Return the shared Confluence client from login config dict.
     config keys expected: url, user, password
     
     Always adds the Atl-Confluence-With-Admin-Key header to bypass page restrictions
     (requires Confluence Cloud Premium/Enterprise and site admin).
+    The client and its connection pool are created once per process (see opsMiles.clients).
     """
-    import requests
-    
-    url = config.get("url")
-    username = config.get("user")
-    password = config.get("password")
-    
-    # Create session with admin key header
-    session = requests.Session()
-    session.headers.update({
-        'Atl-Confluence-With-Admin-Key': 'true'
-    })
-    confluence = Confluence(url=url, username=username, password=password, session=session)
-    
-    return confluence
+    return confluence_client(config)
 
 
-def _paginate_cql(confluence: Confluence, cql: str, debug: bool = False):
-    """Yield result dicts for CQL query, handling paging."""
-    start = 0
-    limit = 50
-    while True:
-        r = confluence.cql(cql, start=start, limit=limit)
-        results = r.get("results", [])
-        total = r.get("totalSize", 0)
-        if debug:
-            print(f"  CQL page: start={start}, got {len(results)} results, totalSize={total}")
-        if not results:
-            break
-        for item in results:
-            yield item
-        start += limit
-        # Use totalSize (total matching results) not size (current batch size)
-        if start >= total:
-            break
+def _paginate_cql(confluence: Confluence, cql: str, debug: bool = False,
+                  limit: int = CQL_PAGE_SIZE, prefetch: bool = True, expand: str = None):
+    """Yield result dicts for CQL query, handling paging.
+
+    expand (e.g. PAGE_EXPAND or 'content.body.storage,content.version,content.ancestors')
+    is passed to the search so each result carries the full page payload, instead of
+    callers fetching every page by id.
+
+    Follows the search cursor (_links.next) rather than start offsets, so deep scans
+    stay fast and do not skip or repeat results when pages change mid-scan. With
+    prefetch the next page is requested in the background while the caller works on
+    the current one. Falls back to start offsets if the server returns no cursor.
+    """
+    pool = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        r = confluence.cql(cql, start=0, limit=limit, expand=expand)
+        start = 0
+        while True:
+            results = r.get("results", [])
+            total = r.get("totalSize", 0)
+            if debug:
+                print(f"  CQL page: start={start}, got {len(results)} results, totalSize={total}")
+            if not results:
+                break
+            start += len(results)
+            next_link = r.get("_links", {}).get("next")
+            if next_link:
+                if expand and 'expand=' not in next_link:
+                    next_link += f"&expand={quote(expand)}"
+                fetch = partial(confluence.get, next_link)
+            elif start < total:
+                # Use totalSize (total matching results) not size (current batch size)
+                fetch = partial(confluence.cql, cql, start=start, limit=limit, expand=expand)
+            else:
+                fetch = None
+            pending = pool.submit(fetch) if (pool and fetch) else None
+            for item in results:
+                yield item
+            if fetch is None:
+                break
+            r = pending.result() if pending else fetch()
+    finally:
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class CandidateMatcher:
+    """
+    Every literal form of a search string (exact, inner, HTML-escaped), each with its
+    own replacement, compiled once into a single case-insensitive alternation.
+    Longer forms are tried first, so '&lt;a@b&gt;' is taken whole rather than as 'a@b'.
+    """
+
+    def __init__(self, forms):
+        # forms: (candidate, replacement) pairs, in order of preference
+        self.replacements = []
+        alternatives = []
+        seen = set()
+        for cand, rep in sorted(forms, key=lambda form: -len(form[0])):
+            if not cand or cand.lower() in seen:
+                continue
+            seen.add(cand.lower())
+            alternatives.append(f"(?P<c{len(self.replacements)}>{re.escape(cand)})")
+            self.replacements.append(rep)
+        self.candidates = list(dict.fromkeys(cand for cand, _ in forms if cand))
+        self.pattern = re.compile("|".join(alternatives), flags=re.IGNORECASE) if alternatives else None
+
+    def spans(self, text: str) -> list:
+        """(start, end, replacement) for every match, in one pass over text."""
+        if self.pattern is None:
+            return []
+        return [(m.start(), m.end(), self.replacements[int(m.lastgroup[1:])])
+                for m in self.pattern.finditer(text)]
+
+    def rewrite(self, text: str):
+        """Return (new_text, number_of_matches)."""
+        parts = []
+        pos = 0
+        spans = self.spans(text)
+        for start, end, rep in spans:
+            parts.append(text[pos:start])
+            parts.append(rep)
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts), len(spans)
+
+
+def candidate_matcher(search_string: str, replace_string: str) -> CandidateMatcher:
+    """Matcher for search_string, its inner form if angle-wrapped (<a@b> -> a@b) and the
+    escaped forms of both, replaced by the matching form of replace_string."""
+    def inner(value):
+        return value[1:-1] if value.startswith('<') and value.endswith('>') else value
+
+    forms = [(search_string, replace_string), (inner(search_string), inner(replace_string))]
+    forms += [(html.escape(cand), html.escape(rep)) for cand, rep in forms]
+    return CandidateMatcher(forms)
 
 
 # Shared helper used by both replace_pages and update_single_page
-def _update_page_by_id(confluence_client, page_id, candidates, replace_s, dry_run_flag, confirm_flag):
+def _update_page_by_id(confluence_client, page_id, matcher, dry_run_flag, confirm_flag, page=None):
     """Return tuple (matched, updated, apply_all_selected).
     matched: pattern found in page storage
     updated: change was applied (False if dry_run or skipped)
     apply_all_selected: user chose 'a' to apply to all remaining pages
+    matcher: CandidateMatcher (see candidate_matcher) applied to the storage body in one pass
+    page: the page with body.storage and version already loaded (e.g. from an expanded CQL scan)
     """
-    # 'candidates' is a list of literal search strings to try on this page
-    # they should be ordered from preferred (exact) to fallback (escaped/inner)
     # Always use the storage representation (body.storage)
-    page = confluence_client.get_page_by_id(page_id, expand='body.storage,version')
+    if page is None:
+        page = confluence_client.get_page_by_id(page_id, expand='body.storage,version')
     title = page.get('title')
     storage = page.get('body', {}).get('storage', {}).get('value', '') or ''
-    representation = 'storage'
 
-    matched = False
-    new_storage = storage
-
-    # Try each candidate string for this page; replace the first candidate that appears.
-    # If a candidate is an escaped form (contains '&lt;' or '&gt;') we should replace with escaped replacement.
-    for cand in candidates:
-        if not cand:
-            continue
-        if cand in storage:
-            matched = True
-            # decide replacement form: if candidate looks escaped, escape the replacement
-            if '&lt;' in cand or '&gt;' in cand or '&amp;' in cand:
-                rep = html.escape(replace_s)
-            else:
-                rep = replace_s
-            new_storage = storage.replace(cand, rep)
-            break
-
-    if not matched:
-        # final fallback: case-insensitive search on raw/unescaped storage
-        try:
-            for cand in candidates:
-                if not cand:
-                    continue
-                ci_pat = re.compile(re.escape(cand), flags=re.IGNORECASE)
-                if ci_pat.search(storage):
-                    matched = True
-                    new_storage = ci_pat.sub(replace_s, storage)
-                    break
-            if not matched:
-                # try unescaped storage
-                unescaped = html.unescape(storage)
-                for cand in candidates:
-                    if not cand:
-                        continue
-                    ci_pat = re.compile(re.escape(cand), flags=re.IGNORECASE)
-                    if ci_pat.search(unescaped):
-                        matched = True
-                        new_unescaped = ci_pat.sub(replace_s, unescaped)
-                        new_storage = html.escape(new_unescaped)
-                        break
-        except re.error:
-            pass
+    new_storage, count = matcher.rewrite(storage)
+    matched = count > 0
     if not matched:
+        if '&#' in storage and matcher.spans(html.unescape(storage)):
+            # only present in some other entity encoding: rewriting that safely needs a manual edit,
+            # so it is reported here but not counted as a match
+            print(f"Page id={page_id} title='{title}' : matches only after unescaping, not changed")
         return (False, False, False)
 
     if new_storage == storage:
@@ -149,7 +214,8 @@ def _update_page_by_id(confluence_client, page_id, candidates, replace_s, dry_ru
 
 
 def replace_pages(config: dict, search_string: str, replace_string: str,
-                  space: Optional[str] = None, dry_run: bool = True, confirm_per_page: bool = False):
+                  space: Optional[str] = None, dry_run: bool = True, confirm_per_page: bool = False,
+                  mirror_db: Optional[str] = None):
     """Search Confluence pages containing `search_string` and replace with `replace_string`.
 
     Args:
@@ -159,6 +225,9 @@ def replace_pages(config: dict, search_string: str, replace_string: str,
       space: optional Confluence space key to restrict search
       dry_run: if True, only print what would be changed
       confirm_per_page: if True and not dry_run, prompt before updating each matched page
+      mirror_db: find candidate pages by exact search of this local mirror (opsMiles.mirror)
+        instead of CQL; a dry run then needs no requests at all, and a real run fetches
+        only the matching pages
 
     Returns: list of page ids modified (or that would be modified).
     """
@@ -179,23 +248,33 @@ def replace_pages(config: dict, search_string: str, replace_string: str,
     modified = []
     apply_all = False
 
-    # use literal substring matching
-    # Build candidate forms to try per-page: exact, inner (if <...>), and escaped versions
-    inner = inner if 'inner' in locals() else (search_string[1:-1] if search_string.startswith('<') and search_string.endswith('>') else search_string)
-    candidates = [search_string]
-    if inner and inner != search_string:
-        candidates.append(inner)
-    # escaped variants
-    candidates.append(html.escape(search_string))
-    if inner and inner != search_string:
-        candidates.append(html.escape(inner))
-
-    for res in _paginate_cql(confluence, cql):
-        page_id = res.get("id")
+    # use literal substring matching of all candidate forms (exact, inner, escaped) in one pass
+    matcher = candidate_matcher(search_string, replace_string)
+
+    if mirror_db:
+        from opsMiles.mirror import FETCH_BATCH, open_mirror, search
+        conn = open_mirror(mirror_db)
+        local = search(conn, matcher.candidates, space=space)
+        conn.close()
+        print(f"  {len(local)} candidate pages in local mirror {mirror_db}")
+        if dry_run:
+            results = local
+        else:
+            # the mirror may be stale: write from the current version of each matching page
+            results = (item for i in range(0, len(local), FETCH_BATCH)
+                       for item in _paginate_cql(confluence, 'id in (' + ', '.join(p['id'] for p in local[i:i + FETCH_BATCH]) + ')',
+                                                 expand=PAGE_EXPAND))
+    else:
+        results = _paginate_cql(confluence, cql, expand=PAGE_EXPAND)
+
+    for res in results:
+        content = res.get("content", res)
+        page_id = content.get("id")
         # decide whether to prompt: if confirm_per_page True and not apply_all
         confirm_flag = (confirm_per_page and not apply_all)
         # call helper with candidate list for this page
-        matched, updated, apply_all_sel = _update_page_by_id(confluence, page_id, candidates, replace_string, dry_run, confirm_flag)
+        matched, updated, apply_all_sel = _update_page_by_id(confluence, page_id, matcher, dry_run,
+                                                             confirm_flag, page=content)
         if apply_all_sel:
             apply_all = True
         if matched:
@@ -263,16 +342,9 @@ def update_single_page(config: dict, page_url: str, search_string: str, replace_
     if not page_id or page_id=='None':
         raise ValueError(f"Could not extract page id from URL: {page_url}")
 
-    # Build candidates for single-page update
-    single_inner = search_string[1:-1] if search_string.startswith('<') and search_string.endswith('>') else search_string
-    single_candidates = [search_string]
-    if single_inner and single_inner != search_string:
-        single_candidates.append(single_inner)
-    single_candidates.append(html.escape(search_string))
-    if single_inner and single_inner != search_string:
-        single_candidates.append(html.escape(single_inner))
-    # Reuse the shared helper with candidates
-    matched, updated, _ = _update_page_by_id(confluence, page_id, single_candidates, replace_string, dry_run, confirm)
+    # Reuse the shared helper with the candidate matcher
+    matched, updated, _ = _update_page_by_id(confluence, page_id, candidate_matcher(search_string, replace_string),
+                                             dry_run, confirm)
     if not matched:
         print(f"Search string not found on page id={page_id}")
         return []
@@ -398,7 +470,7 @@ def _get_current_account_id(confluence) -> str:
     return resp.json()["accountId"]
 
 
-def allow_edit(confluence, url, page_id, title, old_accountid,  new_accountid, dry_run ):
+def allow_edit(confluence, url, page_id, title, old_accountid,  new_accountid, dry_run, snapshot=None):
     """
     Check if old_account_id can edit the page - if so allow new account id to edit
     unless it already can.
@@ -409,17 +481,24 @@ def allow_edit(confluence, url, page_id, title, old_accountid,  new_accountid, d
     :param old_accountid:
     :param new_accountid:
     :param dry_run:
+    :param snapshot: optional PageSnapshot whose cached checks are used instead of new requests
     :return:
     """
-    if page_is_favourited(confluence,url,old_accountid,page_id):
+    if snapshot is not None:
+        favourited = snapshot.is_favourited(url, old_accountid)
+        can_update = snapshot.can_update
+    else:
+        favourited = page_is_favourited(confluence, url, old_accountid, page_id)
+        can_update = lambda account_id: can_user_update_page(confluence.session, url, page_id, account_id)
+    if favourited:
         print(f"Adding favoroite {page_id}")
         add_page_favourite(confluence,url,new_accountid,page_id)
     try:
-        if can_user_update_page(confluence.session, url, page_id, new_accountid):
+        if can_update(new_accountid):
             #print(f"SKIP (Can update {new_accountid}): {title} (id={page_id})")
             return False
 
-        if can_user_update_page(confluence.session, url, page_id, old_accountid):
+        if can_update(old_accountid):
             # old account can edit so let the new one also
             print(f"FIX  (allow update {new_accountid}): {title} (id={page_id})")
             add_user_to_update_restriction(confluence, url, page_id, new_accountid, dry_run=dry_run)
@@ -431,19 +510,27 @@ def allow_edit(confluence, url, page_id, title, old_accountid,  new_accountid, d
 
 
 
+def _wiki_base_url(confluence) -> str:
+    """confluence.url with /wiki, as the v1 REST helpers expect."""
+    base_url = confluence.url.rstrip('/')
+    return base_url if base_url.endswith('/wiki') else f"{base_url}/wiki"
+
+
+def _v2_page_url(confluence, page_id: str) -> str:
+    """REST API v2 URL of a page - handle cases where /wiki may or may not be in confluence.url."""
+    base_url = confluence.url.rstrip('/')
+    if base_url.endswith('/wiki'):
+        return f"{base_url}/api/v2/pages/{page_id}"
+    return f"{base_url}/wiki/api/v2/pages/{page_id}"
+
+
 def get_page_owner(confluence, page_id: str) -> str:
     """Get the owner ID of a Confluence page using REST API v2.
     
     Returns the owner account ID, or empty string if not found.
     """
     try:
-        base_url = confluence.url.rstrip('/')
-        if base_url.endswith('/wiki'):
-            api_url = f"{base_url}/api/v2/pages/{page_id}"
-        else:
-            api_url = f"{base_url}/wiki/api/v2/pages/{page_id}"
-        
-        response = confluence._session.get(api_url)
+        response = confluence._session.get(_v2_page_url(confluence, page_id))
         if response.status_code == 200:
             return response.json().get('ownerId', '')
     except Exception:
@@ -451,6 +538,189 @@ def get_page_owner(confluence, page_id: str) -> str:
     return ''
 
 
+def get_favourite_content_ids(confluence, account_id: str, limit: int = 200):
+    """Ids of all content account_id has favourited, or None if the relation API fails."""
+    path = f"/rest/api/relation/favourite/from/user/{quote(str(account_id), safe='')}/to/content"
+    ids = set()
+    start = 0
+    try:
+        while True:
+            resp = confluence_request(confluence.session, "GET", _wiki_base_url(confluence), path,
+                                      params={"start": start, "limit": limit})
+            if resp.status_code != 200:
+                print(f"  FAILED to list favourites of {account_id}: HTTP {resp.status_code}")
+                return None
+            results = resp.json().get("results", [])
+            ids.update(str(r.get("id")) for r in results if r.get("id"))
+            if len(results) < limit:
+                return ids
+            start += len(results)
+    except Exception as e:
+        print(f"  FAILED to list favourites of {account_id}: {e}")
+        return None
+
+
+def get_watched_content_ids(confluence, account_id: str):
+    """Ids of all pages account_id watches (CQL watcher = ...), or None if the search fails."""
+    try:
+        return {str(item.get("content", item).get("id"))
+                for item in _paginate_cql(confluence, f'watcher = "{account_id}" AND type = page')}
+    except Exception as e:
+        print(f"  FAILED to list pages watched by {account_id}: {e}")
+        return None
+
+
+def build_user_relations(confluence, account_id: str, refresh: bool = False) -> dict:
+    """
+    Pre-build account_id's favourited and watched content ids once per run, so the
+    per-page favourite/watcher checks of process_space become set lookups.
+    Returns dict {accountId, favourites: set or None, watched: set or None};
+    None means the list could not be built and the per-page check is used.
+    Ownership needs no set - it comes with each PageSnapshot.
+    """
+    key = (confluence.url, account_id)
+    # held while building, so spaces processed in parallel wait for one build instead of each scanning
+    with _user_relations_lock:
+        if key in _user_relations and not refresh:
+            return _user_relations[key]
+        relations = {
+            'accountId': account_id,
+            'favourites': get_favourite_content_ids(confluence, account_id),
+            'watched': get_watched_content_ids(confluence, account_id),
+        }
+        print(f"  {account_id}: {len(relations['favourites'] or ())} favourites, "
+              f"{len(relations['watched'] or ())} watched pages")
+        _user_relations[key] = relations
+        return relations
+
+
+class PageSnapshot:
+    """
+    One page as seen by process_single_page, loaded with a single v2 request
+    (title, owner, version and storage body).
+
+    Edit permission, watcher and favourite checks are requested on first use and
+    cached, so each one costs at most one request per page and account; for the
+    account in relations (see build_user_relations) they are set lookups instead.
+    If the page cannot be read, error is set and the page data is empty.
+    """
+
+    def __init__(self, confluence, page_id, title=None, data=None, relations=None):
+        self.confluence = confluence
+        self.page_id = str(page_id)
+        self.relations = relations
+        self.error = None
+        if data is None:
+            data = self._load()
+        self.data = data
+        self.title = data.get('title') or title or f"Page {page_id}"
+        self._can_update = {}
+        self._favourited = {}
+        self._watchers = None
+
+    def _load(self) -> dict:
+        try:
+            response = self.confluence._session.get(_v2_page_url(self.confluence, self.page_id),
+                                                    params={'body-format': 'storage'})
+            if response.status_code == 200:
+                return response.json()
+            self.error = f"HTTP {response.status_code}: {response.text[:200]}"
+        except Exception as e:
+            self.error = str(e)
+        return {}
+
+    @property
+    def owner_id(self) -> str:
+        return self.data.get('ownerId', '')
+
+    @property
+    def version(self) -> int:
+        return self.data.get('version', {}).get('number', 1)
+
+    @property
+    def body(self) -> str:
+        return self.data.get('body', {}).get('storage', {}).get('value', '') or ''
+
+    @property
+    def page(self) -> dict:
+        """Page payload in the shape replace_user_in_page expects, or None if not loaded."""
+        return self.data if self.data.get('body') else None
+
+    def _related(self, kind: str, account_id: str):
+        """True/False from the precomputed relation set, or None if there is none for account_id."""
+        rel = self.relations
+        if rel is None or rel.get('accountId') != account_id or rel.get(kind) is None:
+            return None
+        return self.page_id in rel[kind]
+
+    def can_update(self, account_id: str) -> bool:
+        if account_id not in self._can_update:
+            self._can_update[account_id] = can_user_update_page(self.confluence.session,
+                                                                _wiki_base_url(self.confluence),
+                                                                self.page_id, account_id)
+        return self._can_update[account_id]
+
+    def is_favourited(self, base_url: str, account_id: str) -> bool:
+        related = self._related('favourites', account_id)
+        if related is not None:
+            return related
+        if account_id not in self._favourited:
+            self._favourited[account_id] = page_is_favourited(self.confluence, base_url, account_id, self.page_id)
+        return self._favourited[account_id]
+
+    def has_watcher(self, account_id: str) -> bool:
+        related = self._related('watched', account_id)
+        if related is not None:
+            return related
+        if self._watchers is None:
+            try:
+                self._watchers = {w.get("accountId") for w in self.confluence.get_page_watchers(self.page_id)}
+            except Exception:
+                # Best-effort, as page_has_watcher: restricted watcher API counts as not watching
+                self._watchers = set()
+        return account_id in self._watchers
+
+    def updated(self, version: int, owner_id: str = None, body: str = None) -> None:
+        """Record a successful write so later steps see the new version."""
+        self.data.setdefault('version', {})['number'] = version
+        if owner_id is not None:
+            self.data['ownerId'] = owner_id
+        if body is not None:
+            self.data.setdefault('body', {}).setdefault('storage', {})['value'] = body
+
+
+def _scan_state_name(operation: str, space_key: str, mapping: dict) -> str:
+    # the whole {old: new} mapping is hashed in: a watermark only covers the accounts it was scanned for
+    digest = hashlib.sha1(json.dumps(sorted(mapping.items())).encode('utf-8')).hexdigest()[:16]
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', f"scan-{operation}-{space_key}-{digest}")
+
+
+def load_scan_state(operation: str, space_key: str, mapping: dict):
+    """State saved by the last complete scan of space_key for the accounts in mapping {old: new}:
+    {watermark: ISO time it started, failed: [page ids]}, or None."""
+    return load_cache(_scan_state_name(operation, space_key, mapping), float('inf'))
+
+
+def save_scan_state(operation: str, space_key: str, mapping: dict, started: datetime, failed_ids) -> None:
+    save_cache(_scan_state_name(operation, space_key, mapping),
+               {'watermark': started.isoformat(), 'failed': sorted(set(failed_ids))})
+
+
+def delta_cql(cql: str, state) -> str:
+    """Restrict cql to pages modified since the state's watermark, or that failed last time.
+
+    CQL dates are read in the caller's profile timezone, so the cut-off is the day before
+    the watermark (UTC): a rerun may revisit a few unchanged pages but never misses one.
+    """
+    if not state or not state.get('watermark'):
+        return cql
+    since = (datetime.fromisoformat(state['watermark']) - timedelta(days=1)).strftime('%Y-%m-%d')
+    delta = f'lastmodified >= "{since}"'
+    if state.get('failed'):
+        delta += f' OR id in ({", ".join(str(i) for i in state["failed"])})'
+    return f'{cql} AND ({delta})'
+
+
 def process_space(
     config,
     confluence,
@@ -459,45 +729,126 @@ def process_space(
     new_account_id,
     limit=50,
     dry_run=False,
+    workers=MAX_WORKERS,
+    delta=False,
 ):
     """Process a Confluence space to transfer edit permissions, watchers, ownership, and mentions.
     
+    With delta=True only pages modified since the last complete (non dry-run) scan for
+    the same space and accounts, plus the pages that failed in it, are processed.
+    
+    Runs as a pipeline over bounded queues: one thread enumerates the space with CQL,
+    `workers` threads load PageSnapshots and `workers` threads decide and write each
+    page (process_single_page). The queues hold at most a few pages per worker, so a
+    slow stage holds back the ones before it and memory stays bounded.
+    
     Returns tuple (edit_count, watch_count, owner_count, page_count, mention_count) with number of pages modified.
     """
-    count = 0
-    wcount = 0
-    ocount = 0
-    pcount = 0
-    mcount = 0
+    totals = {'edit': 0, 'watch': 0, 'owner': 0, 'mention': 0, 'failed': 0, 'pages': 0}
+    failed_ids = []
+    errors = []
+    lock = threading.Lock()
+    started = datetime.now(timezone.utc)
+    pages = queue.Queue(maxsize=workers * 4)
+    snapshots = queue.Queue(maxsize=workers * 4)
+    
+    # Old account's favourites and watches, built once per run (not per page)
+    relations = build_user_relations(confluence, old_account_id)
     
     # Use CQL to get ALL pages in space (more reliable than get_all_pages_from_space)
     cql = f'space = "{space_key}" AND type = page'
+    if delta:
+        state = load_scan_state('process', space_key, {old_account_id: new_account_id})
+        cql = delta_cql(cql, state)
+        if state:
+            print(f"  Delta scan: pages changed since {state['watermark']} or failed last time ({len(state.get('failed', []))})")
     
-    for item in _paginate_cql(confluence, cql):
-        # CQL results have page data inside 'content' wrapper
-        content = item.get("content", item)
-        page_id = content.get("id")
-        title = item.get("title") or content.get("title", f"Page {page_id}")
-        if not page_id:
-            continue
-        pcount += 1
-        if (pcount % 100) == 0:
-            print(f"Checked {pcount} pages")
-
-        # Process each page using the shared function
-        page_counts = process_single_page(
-            config, confluence, page_id, old_account_id, new_account_id,
-            dry_run=dry_run, title=title, verbose=False
-        )
-        count += page_counts['edit']
-        wcount += page_counts['watch']
-        ocount += page_counts['owner']
-        mcount += page_counts['mention']
-
+    def enumerate_pages():
+        try:
+            for item in _paginate_cql(confluence, cql):
+                # CQL results have page data inside 'content' wrapper
+                content = item.get("content", item)
+                page_id = content.get("id")
+                title = item.get("title") or content.get("title", f"Page {page_id}")
+                if page_id:
+                    pages.put((page_id, title))
+        finally:
+            for _ in range(workers):
+                pages.put(None)
+    
+    def load_snapshots():
+        try:
+            while True:
+                job = pages.get()
+                if job is None:
+                    return
+                page_id, title = job
+                snapshots.put(PageSnapshot(confluence, page_id, title=title, relations=relations))
+        except Exception as e:
+            # hand the error to the writers, then drain this worker's share so enumeration never blocks
+            snapshots.put(e)
+            while pages.get() is not None:
+                pass
+        finally:
+            snapshots.put(None)
+    
+    def process_snapshots():
+        while True:
+            snapshot = snapshots.get()
+            if snapshot is None:
+                return
+            if isinstance(snapshot, Exception):
+                with lock:
+                    errors.append(snapshot)
+                continue
+            try:
+                # Process each page using the shared function
+                page_counts = process_single_page(
+                    config, confluence, snapshot.page_id, old_account_id, new_account_id,
+                    dry_run=dry_run, title=snapshot.title, verbose=False, snapshot=snapshot
+                )
+            except Exception as e:
+                print(f"  FAILED: {snapshot.title} (id={snapshot.page_id}) -> {e}")
+                page_counts = {'failed': 1}
+            with lock:
+                for key, value in page_counts.items():
+                    totals[key] += value
+                if page_counts.get('failed'):
+                    failed_ids.append(snapshot.page_id)
+                totals['pages'] += 1
+                if (totals['pages'] % 100) == 0:
+                    print(f"Checked {totals['pages']} pages")
+    
+    with ThreadPoolExecutor(max_workers=1 + 2 * workers) as pool:
+        stages = [pool.submit(enumerate_pages)]
+        stages += [pool.submit(load_snapshots) for _ in range(workers)]
+        stages += [pool.submit(process_snapshots) for _ in range(workers)]
+        for stage in stages:
+            stage.result()
+    if errors:
+        raise errors[0]
+    
+    if not dry_run:
+        save_scan_state('process', space_key, {old_account_id: new_account_id}, started, failed_ids)
+    count, wcount, ocount = totals['edit'], totals['watch'], totals['owner']
+    pcount, mcount = totals['pages'], totals['mention']
     print(f"Allowed edit on {count}, watch {wcount}, changed owner {ocount}, mentions replaced {mcount} (checked {pcount} pages)")
     return count, wcount, ocount, pcount, mcount
 
 
+def space_page_counts(confluence, space_keys, workers=MAX_WORKERS) -> dict:
+    """Number of pages in each space, from the CQL totalSize of a one-result search (-1 if unknown)."""
+    def count(space_key):
+        try:
+            return confluence.cql(f'space = "{space_key}" AND type = page', limit=1).get("totalSize", 0)
+        except Exception as e:
+            print(f"  FAILED to count pages in {space_key}: {e}")
+            return -1
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(space_keys, pool.map(count, space_keys)))
+
+
 def process_spaces(
     config,
     confluence,
@@ -506,10 +857,13 @@ def process_spaces(
     new_account_id,
     limit=500,
     dry_run=False,
+    delta=False,
 ):
     """Process multiple Confluence spaces to transfer edit permissions, watchers, ownership, and mentions.
     
-    If space_keys is None or empty, processes all spaces.
+    If space_keys is None or empty, processes all spaces: each space is sized with one
+    CQL count, then the spaces run largest first, SPACE_WORKERS at a time, with a
+    running total printed as each finishes.
     
     Returns dict with totals: {edit, watch, owner, pages, mentions}.
     """
@@ -524,7 +878,7 @@ def process_spaces(
             print(f"\nProcessing space: {s}")
             edit_cnt, watch_cnt, owner_cnt, page_cnt, mention_cnt = process_space(
                 config, confluence, s, old_account_id, new_account_id,
-                limit=limit, dry_run=dry_run
+                limit=limit, dry_run=dry_run, delta=delta
             )
             total_edit += edit_cnt
             total_watch += watch_cnt
@@ -533,18 +887,38 @@ def process_spaces(
             total_mentions += mention_cnt
     else:
         print("Processing all spaces (this may take a long time)...")
-        for space in list_spaces(confluence):
-            space_key = space.get("key")
-            print(f"\nProcessing space: {space_key}")
-            edit_cnt, watch_cnt, owner_cnt, page_cnt, mention_cnt = process_space(
+        sizes = space_page_counts(confluence, [space.get("key") for space in list_spaces(confluence)])
+        # Largest first, SPACE_WORKERS at a time sharing MAX_WORKERS page workers,
+        # so one huge space runs alongside the rest instead of stalling them
+        # (spaces that could not be counted go last)
+        order = sorted((key for key in sizes if sizes[key]), key=lambda key: -sizes[key])
+        print(f"{len(order)} spaces with {sum(max(0, n) for n in sizes.values())} pages "
+              f"({len(sizes) - len(order)} empty spaces skipped)")
+        space_workers = min(SPACE_WORKERS, len(order)) or 1
+        page_workers = max(1, MAX_WORKERS // space_workers)
+        
+        def run_space(space_key):
+            print(f"\nProcessing space: {space_key}" + (f" ({sizes[space_key]} pages)" if sizes[space_key] > 0 else ""))
+            return process_space(
                 config, confluence, space_key, old_account_id, new_account_id,
-                limit=limit, dry_run=dry_run
+                limit=limit, dry_run=dry_run, workers=page_workers, delta=delta
             )
-            total_edit += edit_cnt
-            total_watch += watch_cnt
-            total_owner += owner_cnt
-            total_pages += page_cnt
-            total_mentions += mention_cnt
+        
+        with ThreadPoolExecutor(max_workers=space_workers) as pool:
+            futures = {pool.submit(run_space, key): key for key in order}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    edit_cnt, watch_cnt, owner_cnt, page_cnt, mention_cnt = future.result()
+                except Exception as e:
+                    print(f"FAILED space {futures[future]}: {e}")
+                    continue
+                total_edit += edit_cnt
+                total_watch += watch_cnt
+                total_owner += owner_cnt
+                total_pages += page_cnt
+                total_mentions += mention_cnt
+                print(f"[{done}/{len(order)} spaces] running total: {total_pages} pages checked, "
+                      f"edit {total_edit}, watch {total_watch}, owner {total_owner}, mentions {total_mentions}")
     
     print("\n" + "=" * 50)
     print("CONFLUENCE PROCESSING SUMMARY")
@@ -574,28 +948,32 @@ def process_single_page(
     dry_run=False,
     title=None,
     verbose=True,
+    snapshot=None,
+    relations=None,
 ):
     """Process a single Confluence page to transfer edit permissions, watchers, ownership, and mentions.
     
-    Returns dict with counts: {edit: 0/1, watch: 0/1, owner: 0/1, mention: 0/1}.
+    All decisions read from one PageSnapshot (loaded here unless passed in).
+    Returns dict with counts: {edit: 0/1, watch: 0/1, owner: 0/1, mention: 0/1, failed: 0/1}.
     """
     base_url = config.get("url")
     url = f'{base_url}/wiki/'
     page_url = f"{base_url}/wiki/pages/{page_id}"
     
-    counts = {'edit': 0, 'watch': 0, 'owner': 0, 'mention': 0}
+    counts = {'edit': 0, 'watch': 0, 'owner': 0, 'mention': 0, 'failed': 0}
     
     if verbose:
         print(f"Processing page: {title or page_id}")
     
-    # Get page owner
-    owner_id = ""
-    try:
-        owner_id = get_page_owner(confluence, page_id)
-        if verbose:
-            print(f"  Current owner: {owner_id}")
-    except Exception as e:
-        print(f"  FAILED to get owner: {title or page_id}\n    Page: {page_url}\n    Error: {e}")
+    # Get page owner, body and version in one request
+    if snapshot is None:
+        snapshot = PageSnapshot(confluence, page_id, title=title, relations=relations)
+    owner_id = snapshot.owner_id
+    if snapshot.error:
+        print(f"  FAILED to get owner: {title or page_id}\n    Page: {page_url}\n    Error: {snapshot.error}")
+        counts['failed'] = 1
+    elif verbose:
+        print(f"  Current owner: {owner_id}")
     
     if owner_id == old_account_id:
         # Old user owns the page - grant edit and change owner
@@ -605,22 +983,8 @@ def process_single_page(
                 counts['edit'] = 1
             except Exception as e:
                 print(f"  FAILED to add editor: {title or page_id}\n    Page: {page_url}\n    Error: {e}")
+                counts['failed'] = 1
         
-        if dry_run:
-            if verbose:
-                print(f"  Would change owner: {title or page_id}")
-            counts['owner'] = 1
-        else:
-            try:
-                success, msg = set_page_owner(confluence, page_id, new_account_id)
-                if success and msg != "skipped":
-                    if verbose:
-                        print(f"  Changed owner: {title or page_id}")
-                    counts['owner'] = 1
-                elif not success:
-                    print(f"  FAILED to change owner: {title or page_id}\n    Page: {page_url}\n    Error: {msg}")
-            except Exception as e:
-                print(f"  FAILED to change owner: {title or page_id}\n    Page: {page_url}\n    Error: {e}")
     else:
         # Old user doesn't own - use normal allow_edit check
         try:
@@ -632,14 +996,16 @@ def process_single_page(
                 old_accountid=old_account_id,
                 new_accountid=new_account_id,
                 dry_run=dry_run,
+                snapshot=snapshot,
             )
             if ok:
                 counts['edit'] = 1
         except Exception as e:
             print(f"  FAILED to add editor: {title or page_id}\n    Page: {page_url}\n    Error: {e}")
+            counts['failed'] = 1
     
     # Transfer watcher
-    if page_has_watcher(confluence, page_id, old_account_id):
+    if snapshot.has_watcher(old_account_id):
         try:
             if verbose:
                 print(f"  Trying to watch: {title or page_id} (id={page_id})")
@@ -652,14 +1018,97 @@ def process_single_page(
             counts['watch'] = 1
         except Exception as e:
             print(f"  FAILED to add watcher: {title or page_id}\n    Page: {page_url}\n    Error: {e}")
-    
-    # Replace user mentions
-    if replace_user_in_page(confluence, page_id, old_account_id, new_account_id, dry_run=dry_run):
-        counts['mention'] = 1
+            counts['failed'] = 1
+    
+    # Change owner and replace user mentions in one write (one new page version)
+    if snapshot.page is None:
+        if replace_user_in_page(confluence, page_id, old_account_id, new_account_id, dry_run=dry_run):
+            counts['mention'] = 1
+        return counts
+    plan = plan_page_update(snapshot, new_owner_id=new_account_id if owner_id == old_account_id else None,
+                            mention_from=old_account_id, mention_to=new_account_id)
+    if plan['mention']:
+        print(f"  Found user mention in: {snapshot.title} ({describe_user_ref_changes(plan['changes'])})")
+    if dry_run:
+        if plan['owner'] and verbose:
+            print(f"  Would change owner: {title or page_id}")
+        counts['owner'] = int(plan['owner'])
+        counts['mention'] = int(plan['mention'])
+        return counts
+    if plan['owner'] or plan['mention']:
+        success, msg = apply_page_update(confluence, snapshot, plan)
+        if success:
+            if plan['owner']:
+                if verbose:
+                    print(f"  Changed owner: {title or page_id}")
+                counts['owner'] = 1
+            if plan['mention']:
+                print("    Updated!")
+                counts['mention'] = 1
+        else:
+            what = "change owner" if plan['owner'] else "update"
+            print(f"  FAILED to {what}: {title or page_id}\n    Page: {page_url}\n    Error: {msg}")
+            counts['failed'] = 1
     
     return counts
 
 
+def plan_page_update(snapshot: PageSnapshot, new_owner_id: str = None,
+                     mention_from: str = None, mention_to: str = None) -> dict:
+    """
+    Work out the single write a page needs: an owner change and/or user mentions
+    rewritten from mention_from to mention_to in the storage body.
+    Returns dict {owner: bool, mention: bool, ownerId, body, changes}; nothing to write if both flags are False.
+    """
+    body = snapshot.body
+    plan = {'owner': False, 'mention': False, 'ownerId': None, 'body': body, 'changes': []}
+    if new_owner_id and snapshot.owner_id != new_owner_id:
+        plan['owner'] = True
+        plan['ownerId'] = new_owner_id
+    if mention_from and mention_to:
+        plan['body'], plan['changes'] = rewrite_user_refs(body, {mention_from: mention_to})
+        plan['mention'] = bool(plan['changes'])
+    return plan
+
+
+def apply_page_update(confluence, snapshot: PageSnapshot, plan: dict) -> tuple:
+    """
+    Apply a plan_page_update plan with one REST API v2 PUT (one version increment).
+    Returns (success: bool, message: str) - (True, "skipped") if the plan changes nothing.
+    """
+    if not (plan['owner'] or plan['mention']):
+        return True, "skipped"
+    messages = []
+    if plan['owner']:
+        messages.append("Updated page owner")
+    if plan['mention']:
+        messages.append("Replaced user mentions")
+    update_payload = {
+        "id": snapshot.page_id,
+        "status": "current",
+        "title": snapshot.data.get('title', ''),
+        "body": {
+            "representation": "storage",
+            "value": plan['body']
+        },
+        "version": {
+            "number": snapshot.version + 1,
+            "message": ", ".join(messages),
+            "minorEdit": True
+        },
+    }
+    if plan['owner']:
+        update_payload["ownerId"] = plan['ownerId']
+    try:
+        response = confluence._session.put(_v2_page_url(confluence, snapshot.page_id), json=update_payload)
+    except Exception as e:
+        return False, str(e)
+    if response.status_code in (200, 204):
+        snapshot.updated(snapshot.version + 1, owner_id=plan['ownerId'], body=plan['body'])
+        return True, ", ".join(messages)
+    return False, f"HTTP {response.status_code}: {response.text[:200]}"
+
+
 def list_spaces(confluence, limit=50):
     """
     Yield all spaces visible to the authenticated user.
@@ -679,32 +1128,86 @@ def list_spaces(confluence, limit=50):
         start += limit
 
 
-def replace_user_in_page(confluence, page_id, src_id, dst_id, dry_run=False):
+# User references in storage format: ri:user attributes (mentions, user macros), the
+# data-account-id of inline mention links, and /people/<accountId> profile links
+USER_REF_PATTERN = re.compile(
+    r'(?P<attr>ri:account-id|data-account-id)="(?P<value>[^"]*)"'
+    r'|(?P<people>/people/)(?P<person>[0-9A-Za-z:_-]+)'
+)
+
+
+def find_user_refs(body: str, mapping: dict):
+    """Yield (match, kind, old, new, replacement) for each reference in body to a key of mapping."""
+    for m in USER_REF_PATTERN.finditer(body):
+        if m.group('attr'):
+            kind, old = m.group('attr'), m.group('value')
+            new = mapping.get(old)
+            if new is not None:
+                yield m, kind, old, new, f'{kind}="{new}"'
+        else:
+            old = m.group('person')
+            new = mapping.get(old)
+            if new is not None:
+                yield m, 'people link', old, new, f'/people/{new}'
+
+
+def rewrite_user_refs(body: str, mapping: dict):
+    """
+    Rewrite every user reference to a key of mapping (old accountId -> new accountId)
+    in one pass over the storage body.
+    
+    Returns (new_body, changes) where changes lists (kind, old, new) per rewritten
+    reference; new_body is body itself when nothing changed, so no copy is made.
+    """
+    changes = []
+    parts = []
+    pos = 0
+    for m, kind, old, new, replacement in find_user_refs(body, mapping):
+        parts.append(body[pos:m.start()])
+        parts.append(replacement)
+        pos = m.end()
+        changes.append((kind, old, new))
+    if not changes:
+        return body, changes
+    parts.append(body[pos:])
+    return "".join(parts), changes
+
+
+def describe_user_ref_changes(changes) -> str:
+    """Short summary of rewrite_user_refs changes, e.g. 'ri:account-id x2, people link x1'."""
+    kinds = {}
+    for kind, _, _ in changes:
+        kinds[kind] = kinds.get(kind, 0) + 1
+    return ", ".join(f"{kind} x{n}" for kind, n in kinds.items())
+
+
+def replace_user_in_page(confluence, page_id, src_id, dst_id, dry_run=False, page=None, mapping=None):
     """
     Replace user mentions in a single page.
-    Replaces ri:account-id="src_id" with ri:account-id="dst_id".
+    Rewrites every reference to src_id (mentions, user macros, mention and
+    profile links) to dst_id - or to each account in
+    mapping {old: new}, when given - in one pass (rewrite_user_refs).
+    page may be passed if already loaded with body.storage and version.
     
     Returns True if the page was modified, False otherwise.
     """
-    import re
-    
-    search_pattern = f'ri:account-id="{src_id}"'
-    replace_pattern = f'ri:account-id="{dst_id}"'
+    mapping = mapping or {src_id: dst_id}
     
     try:
-        page = confluence.get_page_by_id(page_id, expand='body.storage,version')
+        if page is None:
+            page = confluence.get_page_by_id(page_id, expand='body.storage,version')
         body = page.get('body', {}).get('storage', {}).get('value', '')
         title = page.get('title', 'Unknown')
         
-        if search_pattern not in body:
+        new_body, changes = rewrite_user_refs(body, mapping)
+        if not changes:
             return False
         
-        print(f"  Found user mention in: {title}")
+        print(f"  Found user mention in: {title} ({describe_user_ref_changes(changes)})")
         
         if dry_run:
             return True
         
-        new_body = body.replace(search_pattern, replace_pattern)
         try:
             confluence.update_page(page_id, title, new_body, representation='storage')
             print(f"    Updated!")
@@ -718,22 +1221,47 @@ def replace_user_in_page(confluence, page_id, src_id, dst_id, dry_run=False):
         return False
 
 
-def replace_user_in_space(confluence, space_key, src_id, dst_id, dry_run=False, confirm=False):
+def mention_cql(account_id: str) -> str:
+    """CQL predicate for content that mentions account_id (mention field, or the id in the text)."""
+    return f'(mention = "{account_id}" OR text ~ "\\"{account_id}\\"")'
+
+
+def replace_user_in_space(confluence, space_key, src_id, dst_id, dry_run=False, confirm=False, full_scan=False,
+                          delta=False, mapping=None):
     """
     Replace user mentions in all pages of a space.
     
+    By default Confluence is asked only for pages that mention src_id (mention_cql);
+    full_scan=True downloads every page in the space instead. Either way the
+    mention is verified in the storage body before anything is written.
+    delta=True limits the scan to pages changed since the last complete run, plus
+    the pages whose update failed or was declined then (see delta_cql).
+    mapping {old: new} replaces several accounts in the same pass (src_id/dst_id name the run).
+    
     Returns list of page IDs that were modified.
     """
+    mapping = mapping or {src_id: dst_id}
+    started = datetime.now(timezone.utc)
+    # a mention search covers fewer pages than a full scan, so each keeps its own watermark
+    operation = 'replace-user-full' if full_scan else 'replace-user'
     cql = f'space = "{space_key}" AND type = page'
+    if not full_scan:
+        cql += ' AND (' + ' OR '.join(mention_cql(old) for old in mapping) + ')'
+    if delta:
+        state = load_scan_state(operation, space_key, mapping)
+        cql = delta_cql(cql, state)
+        if state:
+            print(f"  Delta scan: pages changed since {state['watermark']} or failed last time ({len(state.get('failed', []))})")
+    failed_ids = []
     modified = []
     page_count = 0
     confirm_all = not confirm  # If confirm is False, apply to all
     
-    print(f"  Scanning space: {space_key}")
+    print(f"  Scanning space: {space_key}" + ("" if full_scan else " (pages mentioning the user)"))
     
-    for item in _paginate_cql(confluence, cql):
-        content = item.get("content", item)
-        page_id = content.get("id")
+    for item in _paginate_cql(confluence, cql, expand=PAGE_EXPAND):
+        page = item.get("content", item)
+        page_id = page.get("id")
         if not page_id:
             continue
         
@@ -741,12 +1269,9 @@ def replace_user_in_space(confluence, space_key, src_id, dst_id, dry_run=False,
         if page_count % 100 == 0:
             print(f"  Checked {page_count} pages...")
         
-        # Check if page contains the search pattern before full processing
-        page = confluence.get_page_by_id(page_id, expand='body.storage')
+        # Check if page references the user before full processing
         body = page.get('body', {}).get('storage', {}).get('value', '')
-        search_pattern = f'ri:account-id="{src_id}"'
-        
-        if search_pattern not in body:
+        if next(find_user_refs(body, mapping), None) is None:
             continue
         
         title = page.get('title', 'Unknown')
@@ -755,14 +1280,21 @@ def replace_user_in_space(confluence, space_key, src_id, dst_id, dry_run=False,
         if not confirm_all:
             resp = input(f"    Replace in this page? [y/n/a(ll)]: ").strip().lower()
             if resp == 'n':
+                # still references the old user: revisit it on the next --delta run
+                if not dry_run:
+                    failed_ids.append(page_id)
                 continue
             if resp == 'a':
                 confirm_all = True
         
-        if replace_user_in_page(confluence, page_id, src_id, dst_id, dry_run=dry_run):
+        if replace_user_in_page(confluence, page_id, src_id, dst_id, dry_run=dry_run, page=page, mapping=mapping):
             modified.append(page_id)
+        elif not dry_run:
+            failed_ids.append(page_id)
     
     print(f"  Scanned {page_count} pages total")
+    if not dry_run:
+        save_scan_state(operation, space_key, mapping, started, failed_ids)
     return modified
 
 
@@ -866,9 +1398,69 @@ def get_username_from_accountid(jira, account_id: str) -> str:
     return None
 
 
+def _personal_space_cache_name(confluence) -> str:
+    return 'personal-space-keys-' + _wiki_base_url(confluence).split('//')[-1].replace('/', '_')
+
+
+def forget_personal_space_index(confluence) -> None:
+    """Drop the personal space index (e.g. after creating a personal space)."""
+    cache_name = _personal_space_cache_name(confluence)
+    _personal_spaces.pop(cache_name, None)
+    drop_cache(cache_name)
+
+
+def build_personal_space_index(confluence, refresh: bool = False, ttl: float = PERSONAL_SPACE_TTL) -> dict:
+    """Build (or reuse) the index of personal spaces by space key.
+
+    Pages through /api/v2/spaces?type=personal. The index is kept for the process
+    and in the file cache for ttl seconds.
+
+    Returns {'spaces': {key: {'id', 'key', 'name', 'homepage': {'id'}}},
+             'authors': {authorId: [keys]}}. authorId is the space's creator, which
+    is not the owner when an admin created the space.
+    """
+    cache_name = _personal_space_cache_name(confluence)
+    if not refresh:
+        if cache_name in _personal_spaces:
+            return _personal_spaces[cache_name]
+        cached = load_cache(cache_name, ttl)
+        if cached:
+            _personal_spaces[cache_name] = cached
+            return cached
+
+    base = _wiki_base_url(confluence)
+    site = base[:-len('/wiki')]
+    url = f"{base}/api/v2/spaces"
+    params = {'type': 'personal', 'limit': 250}
+    index = {'spaces': {}, 'authors': {}}
+    while url:
+        response = confluence._session.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        for space in data.get('results', []):
+            key = space.get('key')
+            if not key:
+                continue
+            index['spaces'][key] = {'id': space.get('id'), 'key': key, 'name': space.get('name'),
+                                    'homepage': {'id': space.get('homepageId')}}
+            if space.get('authorId'):
+                index['authors'].setdefault(space['authorId'], []).append(key)
+        # the next link is relative to the site and carries the cursor and limit
+        next_link = data.get('_links', {}).get('next')
+        url = site + next_link if next_link else None
+        params = None
+    print(f"Indexed {len(index['spaces'])} personal spaces")
+    _personal_spaces[cache_name] = index
+    save_cache(cache_name, index)
+    return index
+
+
 def get_personal_space(confluence, account_id: str, username: str = None, jira=None) -> dict:
     """
     Find a user's personal space by accountId or username.
+    The personal space index (build_personal_space_index) is tried first, by the
+    accountId space key and then by creator; users missing from it fall back to
+    guessing the space key.
     Personal space keys in Confluence Cloud:
     - ~username (older format like ~ykang)
     - ~accountid_without_colons_and_dashes (newer format)
@@ -878,6 +1470,22 @@ def get_personal_space(confluence, account_id: str, username: str = None, jira=N
     # Transform: remove : and - from account ID (exact match only)
     clean_id = account_id.replace(':', '').replace('-', '')
     
+    try:
+        index = build_personal_space_index(confluence)
+        space = index['spaces'].get(f"~{clean_id}")
+        if space is None:
+            # The creator is the owner only for a space the user made themselves: accept a
+            # single space created by the account whose key is not another accountId key
+            keys = index['authors'].get(account_id, [])
+            if len(keys) == 1 and not PERSONAL_KEY_PATTERN.fullmatch(keys[0]):
+                space = index['spaces'].get(keys[0])
+        if space:
+            print(f"  Found space with key: {space['key']}")
+            return space
+    except Exception as e:
+        print(f"  Personal space index not available: {e}")
+    
+    
     # Build list of possible keys to try
     possible_keys = [
         f"~{clean_id}",  # e.g., ~712020c1fcfc8a1182487b81157478bfc2d6b8
@@ -904,27 +1512,26 @@ def get_personal_space(confluence, account_id: str, username: str = None, jira=N
     return None
 
 
-def set_page_owner(confluence, page_id: str, owner_account_id: str) -> tuple:
+def set_page_owner(confluence, page_id: str, owner_account_id: str, snapshot: PageSnapshot = None) -> tuple:
     """
     Set the owner of a Confluence page using REST API v2.
-    Requires fetching the page first to get body and version info.
+    Requires fetching the page first to get body and version info, unless a loaded
+    PageSnapshot is passed (it is updated with the new owner and version).
     Returns (success: bool, message: str) - returns (True, "skipped") if owner already matches.
     """
     try:
-        # Build base URL - handle cases where /wiki may or may not be in confluence.url
-        base_url = confluence.url.rstrip('/')
-        if base_url.endswith('/wiki'):
-            api_base = f"{base_url}/api/v2/pages/{page_id}"
-        else:
-            api_base = f"{base_url}/wiki/api/v2/pages/{page_id}"
-        
-        # First get the current page with body and version
-        get_url = f"{api_base}?body-format=storage"
-        get_response = confluence._session.get(get_url)
-        if get_response.status_code != 200:
-            return False, f"Failed to get page: HTTP {get_response.status_code} - {get_url}"
+        api_base = _v2_page_url(confluence, page_id)
         
-        page_data = get_response.json()
+        if snapshot is not None and snapshot.page is not None:
+            page_data = snapshot.data
+        else:
+            # First get the current page with body and version
+            get_url = f"{api_base}?body-format=storage"
+            get_response = confluence._session.get(get_url)
+            if get_response.status_code != 200:
+                return False, f"Failed to get page: HTTP {get_response.status_code} - {get_url}"
+            
+            page_data = get_response.json()
         
         # Check if owner already matches
         current_owner = page_data.get('ownerId', '')
@@ -954,6 +1561,8 @@ def set_page_owner(confluence, page_id: str, owner_account_id: str) -> tuple:
         
         response = confluence._session.put(api_base, json=update_payload)
         if response.status_code in (200, 204):
+            if snapshot is not None:
+                snapshot.updated(current_version + 1, owner_id=owner_account_id)
             return True, "Owner updated"
         else:
             return False, f"HTTP {response.status_code}: {response.text[:200]}"
@@ -962,10 +1571,11 @@ def set_page_owner(confluence, page_id: str, owner_account_id: str) -> tuple:
 
 
 def copy_page_to_space(confluence, page_id: str, dst_space_key: str, parent_id: str = None, 
-                       dst_owner_id: str = None, dry_run: bool = False) -> tuple:
+                       dst_owner_id: str = None, dry_run: bool = False, page: dict = None) -> tuple:
     """
     Copy a page to a different space.
     If dst_owner_id is provided, sets the owner of the new page to that account.
+    page may be passed if already loaded with body.storage.
     Returns (success: bool, new_page_id or error_msg)
     """
     if dry_run:
@@ -973,7 +1583,8 @@ def copy_page_to_space(confluence, page_id: str, dst_space_key: str, parent_id:
     
     try:
         # Get the source page
-        page = confluence.get_page_by_id(page_id, expand='body.storage,version')
+        if page is None:
+            page = confluence.get_page_by_id(page_id, expand='body.storage,version')
         title = page.get('title')
         body = page.get('body', {}).get('storage', {}).get('value', '')
         
@@ -1034,6 +1645,7 @@ def create_personal_space(confluence, account_id: str, display_name: str = None)
         response = confluence._session.post(api_url, json=payload)
         if response.status_code in (200, 201):
             print(f"Created personal space: {space_key}")
+            forget_personal_space_index(confluence)
             return True, space_key
         else:
             return False, f"Failed to create space: HTTP {response.status_code} - {response.text[:200]}"
@@ -1041,9 +1653,11 @@ def create_personal_space(confluence, account_id: str, display_name: str = None)
         return False, str(e)
 
 
-def move_page_to_space(confluence, page_id: str, dst_space_key: str, dst_parent_id: str = None) -> tuple:
+def move_page_to_space(confluence, page_id: str, dst_space_key: str, dst_parent_id: str = None,
+                       dst_space_id: str = None) -> tuple:
     """
-    Move a page to a different space.
+    Move a page (with its descendants) to a different space.
+    dst_space_id saves looking the destination space up when moving many pages.
     
     Returns (success: bool, message: str)
     """
@@ -1055,19 +1669,20 @@ def move_page_to_space(confluence, page_id: str, dst_space_key: str, dst_parent_
             api_url = f"{base_url}/wiki/api/v2/pages/{page_id}/move"
         
         payload = {
-            "spaceId": None,  # Will be filled in
+            "spaceId": dst_space_id,  # Filled in below if not given
             "targetKey": dst_space_key
         }
         
         # Get the destination space ID
-        try:
-            dst_space = confluence.get_space(dst_space_key)
-            if dst_space:
-                space_id = dst_space.get('id')
-                if space_id:
-                    payload["spaceId"] = space_id
-        except Exception:
-            pass
+        if not dst_space_id:
+            try:
+                dst_space = confluence.get_space(dst_space_key)
+                if dst_space:
+                    space_id = dst_space.get('id')
+                    if space_id:
+                        payload["spaceId"] = space_id
+            except Exception:
+                pass
         
         # If we have a parent, set it
         if dst_parent_id:
@@ -1170,74 +1785,84 @@ def move_personal_space(confluence, src_account_id: str, dst_account_id: str,
         dst_key = dst_space.get('key')
         print(f"Found destination personal space: {dst_space.get('name', dst_key)} ({dst_key})")
     
-    # Get all pages from source space using CQL (more reliable for restricted pages)
-    all_pages = []
-    cql = f'space = "{src_key}" AND type = page'
+    dst_space_id = None
+    try:
+        dst_space_id = (dst_space or confluence.get_space(dst_key) or {}).get('id')
+    except Exception:
+        pass
     
-    for item in _paginate_cql(confluence, cql):
+    # Get all pages from source space with their ancestors in one CQL scan
+    # (more reliable for restricted pages)
+    pages = {}
+    cql = f'space = "{src_key}" AND type = page'
+    for item in _paginate_cql(confluence, cql, expand='content.ancestors'):
         # CQL results have page data inside 'content' wrapper
         content = item.get("content", item)
-        page_id = content.get("id")
-        if not page_id:
-            continue
-        # Fetch full page details with ancestors for hierarchy
-        try:
-            page = confluence.get_page_by_id(page_id, expand='ancestors')
-            all_pages.append(page)
-        except Exception as e:
-            print(f"  Warning: could not fetch page {page_id}: {e}")
-    
-    print(f"Found {len(all_pages)} total pages to move")
+        if content.get("id"):
+            pages[content["id"]] = content
     
-    if not all_pages:
+    if not pages:
         return True, "No pages found in source space", 0
     
-    print(f"Found {len(all_pages)} total pages to move")
-    
-    # Build a map of old page IDs to track hierarchy
-    # Sort pages by ancestor count (parents first, then children)
-    def ancestor_count(page):
-        return len(page.get('ancestors', []))
+    print(f"Found {len(pages)} total pages to move")
     
-    all_pages.sort(key=ancestor_count)
+    # Build the page tree: moving a page carries all its descendants, so only the
+    # roots (pages whose parent is not in the space scan) need a move request
+    children = {}
+    roots = []
+    for page_id, page in pages.items():
+        ancestors = page.get('ancestors', [])
+        parent_id = ancestors[-1].get('id') if ancestors else None
+        if parent_id in pages:
+            children.setdefault(parent_id, []).append(page_id)
+        else:
+            roots.append(page_id)
     
-    # Track mapping from old page ID to new page ID for parent references
-    id_mapping = {}
+    def subtree_size(page_id):
+        return 1 + sum(subtree_size(child) for child in children.get(page_id, []))
     
-    moved = 0
-    skipped = 0
-    failed = 0
+    lock = threading.Lock()
+    counts = {'moved': 0, 'skipped': 0, 'failed': 0}
     
-    for page in all_pages:
-        page_id = page.get('id')
-        title = page.get('title')
-        ancestors = page.get('ancestors', [])
-        
-        # Find the immediate parent (last in ancestors list)
-        dst_parent_id = None
-        if ancestors:
-            old_parent_id = ancestors[-1].get('id')
-            # Check if parent was already moved
-            dst_parent_id = id_mapping.get(old_parent_id)
-        
+    def move_subtree(page_id):
+        title = pages[page_id].get('title')
+        size = subtree_size(page_id)
+        extra = f" (+{size - 1} pages below)" if size > 1 else ""
         if dry_run:
-            print(f"  Would move: {title}")
-            moved += 1
-            id_mapping[page_id] = page_id  # Fake mapping for dry run
+            print(f"  Would move: {title}{extra}")
+            with lock:
+                counts['moved'] += size
+            return
+        success, msg = move_page_to_space(confluence, page_id, dst_key, dst_space_id=dst_space_id)
+        if success and 'skipped' not in msg:
+            print(f"  Moved: {title}{extra}")
+            with lock:
+                counts['moved'] += size
+            return
+        if success:
+            print(f"  Skipped (exists): {title}")
+            key = 'skipped'
         else:
-            success, msg = move_page_to_space(confluence, page_id, dst_key, dst_parent_id)
-            if success:
-                if 'skipped' in msg:
-                    print(f"  Skipped (exists): {title}")
-                    skipped += 1
-                else:
-                    print(f"  Moved: {title}")
-                    moved += 1
-                # The page keeps its ID after move
-                id_mapping[page_id] = page_id
-            else:
-                print(f"  FAILED to move: {title} - {msg}")
-                failed += 1
+            print(f"  FAILED to move: {title} - {msg}")
+            key = 'failed'
+        with lock:
+            counts[key] += 1
+        # The subtree did not move: move the children on their own (top level in the destination)
+        for child in children.get(page_id, []):
+            move_subtree(child)
+    
+    print(f"Moving {len(roots)} top-level pages with their descendants")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        list(pool.map(move_subtree, roots))
+    
+    moved, skipped, failed = counts['moved'], counts['skipped'], counts['failed']
+    if not dry_run:
+        # Verify: whatever did not move is still in the source space
+        try:
+            left = confluence.cql(cql, limit=1).get("totalSize", 0)
+            print(f"Verification: {left} pages left in {src_key}")
+        except Exception as e:
+            print(f"  Warning: could not verify {src_key}: {e}")
     
     return True, f"Moved {moved} pages, skipped {skipped} (already exist), failed {failed}", moved
 
@@ -1280,11 +1905,153 @@ def transfer_personal_space(config, confluence, src_account_id: str, dst_account
     return True, f"Transferred {owner_cnt} page owners, {edit_cnt} edit perms, {watch_cnt} watchers, moved {moved_cnt} pages", (edit_cnt, watch_cnt, owner_cnt, moved_cnt)
 
 
+def copy_page_hierarchy(confluence, page_id: str, dst_parent_id: str) -> tuple:
+    """
+    Start a server-side copy of a page and all its descendants under dst_parent_id
+    (which may be in another space). The copy runs as a Confluence long task.
+    Returns (success: bool, task_id or error_msg)
+    """
+    try:
+        api_url = f"{_wiki_base_url(confluence)}/rest/api/content/{page_id}/pagehierarchy/copy"
+        payload = {
+            "copyAttachments": True,
+            "copyPermissions": True,
+            "copyProperties": True,
+            "copyLabels": True,
+            "copyCustomContents": True,
+            "destinationPageId": dst_parent_id,
+            "titleOptions": {"prefix": "", "replace": "", "search": ""},
+        }
+        response = confluence._session.post(api_url, json=payload)
+        if response.status_code in (200, 202):
+            task_id = response.json().get('id')
+            if task_id:
+                return True, task_id
+            return False, "no task id in response"
+        return False, f"HTTP {response.status_code}: {response.text[:200]}"
+    except Exception as e:
+        return False, str(e)
+
+
+def wait_for_longtask(confluence, task_id: str, poll: float = LONGTASK_POLL,
+                      timeout: float = LONGTASK_TIMEOUT) -> tuple:
+    """
+    Poll a Confluence long task until it finishes.
+    Returns (success: bool, message: str)
+    """
+    api_url = f"{_wiki_base_url(confluence)}/rest/api/longtask/{task_id}"
+    deadline = time.monotonic() + timeout
+    last = None
+    while True:
+        try:
+            # the task status changes between polls, so never answer it from the response memo
+            response = confluence._session.get(api_url, headers={NO_MEMO_HEADER: '1'})
+            if response.status_code != 200:
+                return False, f"HTTP {response.status_code}: {response.text[:200]}"
+            task = response.json()
+        except Exception as e:
+            return False, str(e)
+        percent = task.get('percentageComplete')
+        if task.get('finished'):
+            messages = '; '.join(m.get('translation') or m.get('key', '') for m in task.get('messages', []))
+            if task.get('successful', True):
+                return True, messages or "done"
+            return False, messages or "task failed"
+        if percent != last:
+            print(f"    {percent}% done")
+            last = percent
+        if time.monotonic() > deadline:
+            return False, f"timed out after {timeout:.0f}s ({percent}% done)"
+        time.sleep(poll)
+
+
+def _stream_copy_pages(confluence, page_ids: list, parents: dict, dst_key: str,
+                       dst_parent_id: str, dst_owner_id: str) -> tuple:
+    """
+    Copy pages one at a time with copy_page_to_space, keeping the hierarchy.
+    page_ids must list parents before their children; parents maps page id to parent id.
+    Bodies are fetched FETCH_BATCH pages at a time, so memory stays bounded.
+    Returns (copied, failed)
+    """
+    from opsMiles.mirror import FETCH_BATCH
+
+    new_ids = {}
+    copied = 0
+    failed = 0
+    for i in range(0, len(page_ids), FETCH_BATCH):
+        batch = page_ids[i:i + FETCH_BATCH]
+        loaded = {}
+        for item in _paginate_cql(confluence, f'id in ({", ".join(batch)})', expand=PAGE_EXPAND):
+            content = item.get("content", item)
+            loaded[content.get('id')] = content
+        for page_id in batch:
+            page = loaded.get(page_id)
+            if page is None:
+                print(f"  FAILED: page {page_id} - could not be read")
+                failed += 1
+                continue
+            # a page whose parent failed to copy goes directly under dst_parent_id
+            parent_id = new_ids.get(parents.get(page_id), dst_parent_id)
+            success, result = copy_page_to_space(confluence, page_id, dst_key, parent_id=parent_id,
+                                                 dst_owner_id=dst_owner_id, page=page)
+            if success:
+                print(f"  Copied: {page.get('title')} (owner set to {dst_owner_id})")
+                new_ids[page_id] = result
+                copied += 1
+            else:
+                print(f"  FAILED: {page.get('title')} - {result}")
+                failed += 1
+    return copied, failed
+
+
+def _copied_page_ids(confluence, dst_key: str, dst_parent_id: str, title: str) -> list:
+    """
+    Ids of the pages a hierarchy copy of a page titled title created under dst_parent_id,
+    copied root first. Titles are unique within a space, so the root is the child of
+    dst_parent_id with that title.
+    """
+    quoted = title.replace('\\', '\\\\').replace('"', '\\"')
+    cql = f'space = "{dst_key}" AND type = page AND parent = {dst_parent_id} AND title = "{quoted}"'
+    roots = [item.get("content", item).get("id") for item in _paginate_cql(confluence, cql)]
+    if not roots:
+        return []
+    ids = [roots[0]]
+    for item in _paginate_cql(confluence, f'type = page AND ancestor = {roots[0]}'):
+        ids.append(item.get("content", item).get("id"))
+    return ids
+
+
+def _set_owner_of_pages(confluence, page_ids: list, owner_id: str) -> int:
+    """
+    Set owner_id as owner of page_ids; returns the number changed.
+    Pages are read in batches from the v2 page listing, so each one costs only its PUT.
+    """
+    url = f"{_wiki_base_url(confluence)}/api/v2/pages"
+    updated = 0
+    for i in range(0, len(page_ids), 250):
+        params = {'id': page_ids[i:i + 250], 'body-format': 'storage', 'limit': 250}
+        response = confluence._session.get(url, params=params)
+        if response.status_code != 200:
+            print(f"    Warning: Could not read copied pages: HTTP {response.status_code}")
+            continue
+        for data in response.json().get('results', []):
+            snapshot = PageSnapshot(confluence, data.get('id'), data=data)
+            success, msg = set_page_owner(confluence, snapshot.page_id, owner_id, snapshot=snapshot)
+            if success and msg != "skipped":
+                updated += 1
+            elif not success:
+                print(f"    Warning: Could not set owner of {snapshot.title}: {msg}")
+    return updated
+
+
 def copy_personal_space(confluence, src_account_id: str, dst_account_id: str, 
                         src_username: str = None, dst_username: str = None,
                         jira=None, dry_run: bool = False) -> tuple:
     """
-    Copy all pages from src user's personal space to dst user's personal space.
+    Copy all pages from src user's personal space to dst user's personal space,
+    under the destination homepage and keeping the page hierarchy.
+    Each top-level page is copied with its descendants by a server-side hierarchy copy;
+    if the site refuses that, its pages are copied one by one instead.
     Returns (success: bool, message: str)
     
     If usernames are not provided, will look up via Jira API.
@@ -1309,42 +2076,80 @@ def copy_personal_space(confluence, src_account_id: str, dst_account_id: str,
     dst_name = dst_space.get('name', dst_key)
     print(f"Found destination personal space: {dst_name} ({dst_key})")
     
-    # Get all pages from source space using CQL (more reliable for restricted pages)
-    pages = []
+    dst_home_id = (dst_space.get('homepage') or {}).get('id')
+    if not dst_home_id:
+        try:
+            dst_home_id = ((confluence.get_space(dst_key, expand='homepage') or {}).get('homepage') or {}).get('id')
+        except Exception:
+            pass
+    
+    # Page tree of the source space from one CQL scan (more reliable for restricted pages);
+    # bodies are not loaded here
+    titles = {}
+    parents = {}
     cql = f'space = "{src_key}" AND type = page'
-    for item in _paginate_cql(confluence, cql):
+    for item in _paginate_cql(confluence, cql, expand='content.ancestors'):
         content = item.get("content", item)
         page_id = content.get("id")
         if page_id:
-            try:
-                page = confluence.get_page_by_id(page_id, expand='body.storage')
-                pages.append(page)
-            except Exception as e:
-                print(f"  Warning: could not fetch page {page_id}: {e}")
+            ancestors = content.get('ancestors', [])
+            titles[page_id] = content.get('title')
+            parents[page_id] = ancestors[-1].get('id') if ancestors else None
     
-    if not pages:
+    if not titles:
         return True, f"No pages found in {src_key}"
     
+    children = {}
+    roots = []
+    for page_id, parent_id in parents.items():
+        if parent_id in titles:
+            children.setdefault(parent_id, []).append(page_id)
+        else:
+            roots.append(page_id)
+    
+    def subtree(page_id):
+        """page_id and its descendants, parents first"""
+        ids = [page_id]
+        for page in ids:
+            ids.extend(children.get(page, []))
+        return ids
+    
     copied = 0
     failed = 0
-    print(f"Found {len(pages)} pages to copy")
+    print(f"Found {len(titles)} pages to copy ({len(roots)} top-level)")
     
-    for page in pages:
-        page_id = page.get('id')
-        title = page.get('title')
-        
+    created = []
+    for root in roots:
+        ids = subtree(root)
+        extra = f" (+{len(ids) - 1} pages below)" if len(ids) > 1 else ""
         if dry_run:
-            print(f"  Would copy: {title}")
-            copied += 1
-        else:
-            success, result = copy_page_to_space(confluence, page_id, dst_key, 
-                                                  dst_owner_id=dst_account_id, dry_run=dry_run)
+            print(f"  Would copy: {titles[root]}{extra}")
+            copied += len(ids)
+            continue
+        if dst_home_id:
+            success, task_id = copy_page_hierarchy(confluence, root, dst_home_id)
             if success:
-                print(f"  Copied: {title} (owner set to {dst_account_id})")
-                copied += 1
-            else:
-                print(f"  FAILED: {title} - {result}")
-                failed += 1
+                print(f"  Copying: {titles[root]}{extra}")
+                success, msg = wait_for_longtask(confluence, task_id)
+                if success:
+                    print(f"  Copied: {titles[root]}{extra}")
+                    copied += len(ids)
+                    new_ids = _copied_page_ids(confluence, dst_key, dst_home_id, titles[root])
+                    if len(new_ids) != len(ids):
+                        print(f"    Warning: found {len(new_ids)} of {len(ids)} copied pages to set the owner of")
+                    created.extend(new_ids)
+                else:
+                    print(f"  FAILED: {titles[root]}{extra} - {msg}")
+                    failed += len(ids)
+                continue
+            print(f"  Hierarchy copy not available for {titles[root]} ({task_id}), copying pages one by one")
+        done, bad = _stream_copy_pages(confluence, ids, parents, dst_key, dst_home_id, dst_account_id)
+        copied += done
+        failed += bad
+    
+    if created:
+        updated = _set_owner_of_pages(confluence, created, dst_account_id)
+        print(f"Owner set to {dst_account_id} on {updated} copied pages")
     
     return True, f"Copied {copied} pages, failed {failed}"
 
@@ -0,0 +1,117 @@
+"""
+Local mirror of Confluence page bodies for exact offline search.
+
+CQL `text ~` is tokenised and fuzzy, so it misses exact substrings such as
+`<someone@lsst.org>`. mirror_space() copies a space's storage-format bodies into
+a SQLite file (by default in the opsMiles cache directory) and refreshes only
+pages whose version changed. search() then finds exact substrings locally using an
+FTS5 trigram index when the SQLite build has one, or a plain instr() scan otherwise.
+replace_pages(..., mirror_db=...) (opsAdmin --replace-text --use-mirror, with
+--mirror-db for another database file) uses it to plan search/replace offline and
+fetch only the matching pages for writing.
+"""
+
+import os
+import sqlite3
+
+from opsMiles.ocache import CACHE_DIR
+
+MIRROR_DB = os.path.join(CACHE_DIR, 'confluence-mirror.sqlite')
+
+# Page ids per 'id in (...)' CQL fetch of changed pages
+FETCH_BATCH = 50
+
+
+class MirrorConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers whether the FTS5 trigram index is available."""
+    fts = False
+
+
+def open_mirror(path: str = None) -> MirrorConnection:
+    """Open (creating if needed) the mirror database; conn.fts tells if the trigram index exists."""
+    path = path or MIRROR_DB
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, factory=MirrorConnection)
+    conn.execute('CREATE TABLE IF NOT EXISTS pages (id INTEGER PRIMARY KEY, space TEXT, title TEXT, '
+                 'version INTEGER, body TEXT)')
+    conn.execute('CREATE INDEX IF NOT EXISTS pages_space ON pages (space)')
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(body, content='pages', "
+                     "content_rowid='id', tokenize='trigram')")
+        conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+              INSERT INTO pages_fts(rowid, body) VALUES (new.id, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+              INSERT INTO pages_fts(pages_fts, rowid, body) VALUES ('delete', old.id, old.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE ON pages BEGIN
+              INSERT INTO pages_fts(pages_fts, rowid, body) VALUES ('delete', old.id, old.body);
+              INSERT INTO pages_fts(rowid, body) VALUES (new.id, new.body);
+            END;
+        """)
+        fts = True
+    except sqlite3.OperationalError:
+        # SQLite without FTS5 or the trigram tokenizer (< 3.34): search falls back to instr()
+        fts = False
+    conn.commit()
+    conn.fts = fts
+    return conn
+
+
+def mirror_space(confluence, space_key: str, path: str = None) -> dict:
+    """Bring the mirror of space_key up to date; only new or changed pages are downloaded.
+
+    Returns counts {pages, fetched, removed}.
+    """
+    from opsMiles.confluence import PAGE_EXPAND, _paginate_cql
+
+    conn = open_mirror(path)
+    stored = dict(conn.execute('SELECT id, version FROM pages WHERE space = ?', (space_key,)))
+    current = {}
+    for item in _paginate_cql(confluence, f'space = "{space_key}" AND type = page', expand='content.version'):
+        content = item.get("content", item)
+        if content.get("id"):
+            current[int(content["id"])] = content.get("version", {}).get("number", 0)
+
+    changed = [pid for pid, version in current.items() if stored.get(pid) != version]
+    removed = [pid for pid in stored if pid not in current]
+    print(f"Mirror {space_key}: {len(current)} pages, {len(changed)} new or changed, {len(removed)} removed")
+
+    for i in range(0, len(changed), FETCH_BATCH):
+        ids = ', '.join(str(pid) for pid in changed[i:i + FETCH_BATCH])
+        rows = []
+        for item in _paginate_cql(confluence, f'id in ({ids})', expand=PAGE_EXPAND):
+            page = item.get("content", item)
+            rows.append((int(page['id']), space_key, page.get('title', ''),
+                         page.get('version', {}).get('number', 0),
+                         page.get('body', {}).get('storage', {}).get('value', '') or ''))
+        conn.executemany('INSERT OR REPLACE INTO pages (id, space, title, version, body) VALUES (?, ?, ?, ?, ?)', rows)
+        conn.commit()
+        print(f"  fetched {min(i + FETCH_BATCH, len(changed))}/{len(changed)}")
+    conn.executemany('DELETE FROM pages WHERE id = ?', [(pid,) for pid in removed])
+    conn.commit()
+    conn.close()
+    return {'pages': len(current), 'fetched': len(changed), 'removed': len(removed)}
+
+
+def search(conn: MirrorConnection, needles, space: str = None) -> list:
+    """Pages whose body contains any of needles (case-insensitive), as page dicts shaped
+    like an expanded CQL result: {id, title, version: {number}, body: {storage: {value}}}.
+    """
+    needles = [n for n in needles if n]
+    where, params = [], []
+    if conn.fts and all(len(n) >= 3 for n in needles):
+        # trigram MATCH of a quoted phrase is a case-insensitive substring search
+        where.append('id IN (SELECT rowid FROM pages_fts WHERE pages_fts MATCH ?)')
+        params.append(' OR '.join('"' + n.replace('"', '""') + '"' for n in needles))
+    else:
+        where.append('(' + ' OR '.join('instr(lower(body), ?) > 0' for _ in needles) + ')')
+        params.extend(n.lower() for n in needles)
+    if space:
+        where.append('space = ?')
+        params.append(space)
+    sql = f'SELECT id, title, version, body FROM pages WHERE {" AND ".join(where)} ORDER BY id'
+    return [{'id': str(pid), 'title': title, 'version': {'number': version},
+             'body': {'storage': {'value': body}}}
+            for pid, title, version, body in conn.execute(sql, params)]
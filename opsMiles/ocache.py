@@ -0,0 +1,49 @@
+"""
+Small JSON file cache for data that is expensive to rebuild from the Atlassian
+REST APIs (group memberships, space listings) but fine to reuse for a while.
+
+Files live in ~/.cache/opsMiles (override with OPSMILES_CACHE) and carry the
+time they were written so callers can apply their own TTL.
+"""
+
+import json
+import os
+import time
+
+CACHE_DIR = os.environ.get('OPSMILES_CACHE', os.path.expanduser('~/.cache/opsMiles'))
+
+
+def cache_path(name: str) -> str:
+    return os.path.join(CACHE_DIR, f'{name}.json')
+
+
+def load_cache(name: str, ttl: float):
+    """Return the cached data for name, or None if missing, unreadable or older than ttl seconds."""
+    try:
+        with open(cache_path(name)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get('saved', 0) > ttl:
+        return None
+    return entry.get('data')
+
+
+def save_cache(name: str, data) -> None:
+    """Write data for name; failures are reported but never fatal."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = cache_path(name) + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'saved': time.time(), 'data': data}, f)
+        os.replace(tmp, cache_path(name))
+    except OSError as e:
+        print(f'WARNING: could not write cache {name}: {e}')
+
+
+def drop_cache(name: str) -> None:
+    """Forget the cached data for name, if any."""
+    try:
+        os.remove(cache_path(name))
+    except OSError:
+        pass
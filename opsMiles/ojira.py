@@ -1,8 +1,11 @@
 import sys
+import threading
 
 from atlassian import Confluence
 from jira import JIRA
 
+from opsMiles.clients import MAX_WORKERS, http_session, jira_client
+from opsMiles.ocache import load_cache, save_cache
 from opsMiles.uname import get_from_keyring
 
 #API_ENDPOINT = "https://jira.lsstcorp.org/rest/api/latest/"
@@ -15,6 +18,16 @@ MFIELDS = ["key", "RO Milestone ID", "type", "summary", "duedate", "startdate",
 FIELDS = ["key", "type", "summary", "duedate", "Start date",
            "RubinTeam", "component", "status"]
 
+# Seconds a group membership index stays valid (process and file cache)
+GROUP_INDEX_TTL = 3600
+_group_index = {}
+
+# Per-process shared state so repeated operations (e.g. opsAdmin --batch)
+# reuse one user directory and field list (clients are shared by opsMiles.clients)
+_shared_lock = threading.Lock()
+_user_directory = {}
+_jira_fields = {}
+
 def list_rdo_issues(jira=None, fields=FIELDS, pred2=""):
     """
     Get the issues from Jira RDO project.
@@ -95,7 +108,8 @@ def list_jira_issues(jira, pred2=None, query=None, order="order by duedate asc",
 
 
 def get_jira_from_config(config:dict):
-    return get_jira(username=config['user'], prompt=False, password=config['password'])[2]
+    """Return the shared JIRA client for config (created and auth checked once per process)."""
+    return jira_client(config)
 
 def get_jira(username=None, prompt=False, password=None):
     """ Setup up the JIRA object endpoint - prompt
@@ -109,13 +123,14 @@ def get_jira(username=None, prompt=False, password=None):
     if password is None:
         user, pw = get_from_keyring(username=username, prompt=prompt)
     print(f"Jira user: {user} end point: {EP}")
-    jira = JIRA(server=EP, basic_auth=(user, pw))
-    try:
-        jira.myself()
-    except Exception as e:
-        raise Exception(f"Authentication failed for user '{user}': {e}")
+    jira = jira_client({"user": user, "password": pw, "url": EP})
     return (user, pw, jira)
 
+def _config_from_jira(jira: JIRA) -> dict:
+    """Login config (url, user, password) of an existing basic-auth JIRA client."""
+    user, pw = jira._session.auth
+    return {"user": user, "password": pw, "url": jira.server_url}
+
 def get_login_config(args):
     username = args.uname
     user, pw = get_from_keyring(username=username, prompt=args.ask)
@@ -156,37 +171,40 @@ def get_last_comment(jira, key):
 # User and Group Management Functions
 # ============================================================================
 
-def get_all_atlassian_users(config: dict, page_size: int = 1000) -> list:
+def get_all_atlassian_users(config: dict, page_size: int = 1000, include_inactive: bool = False) -> list:
     """Fetch all users from Atlassian REST /rest/api/3/users/search (paged).
 
-    Returns list of user dicts as returned by the API.
+    Returns list of user dicts as returned by the API. Inactive accounts are
+    dropped unless include_inactive is set. The directory is fetched once per
+    process and site.
     """
-    import requests
-    from requests.auth import HTTPBasicAuth
-    
     base = config.get('url')
     if not base:
         raise ValueError('Missing url in config')
+    key = (base, include_inactive)
+    if key in _user_directory:
+        return _user_directory[key]
     url = base.rstrip('/') + '/rest/api/3/users/search'
-    auth = HTTPBasicAuth(config.get('user'), config.get('password'))
+    session = http_session(config)
 
     users = []
     start_at = 0
     while True:
         params = {'startAt': start_at, 'maxResults': page_size}
-        r = requests.get(url, auth=auth, params=params)
+        r = session.get(url, params=params)
         if r.status_code >= 400:
             raise RuntimeError(f'Failed to fetch users: {r.status_code} {r.text}')
         page = r.json()
         if not isinstance(page, list):
             raise RuntimeError(f'unexpected users response: {page}')
         for u in page:
-            if isinstance(u, dict) and u.get('active'):
+            if isinstance(u, dict) and (include_inactive or u.get('active')):
                users.append(u)
 
         if len(page) < page_size:
             break
         start_at += page_size
+    _user_directory[key] = users
     return users
 
 
@@ -210,17 +228,13 @@ def get_account_ids_by_display_prefix(config: dict, prefix: str) -> list:
 
 def list_user_groups(config: dict, account_id: str) -> list:
     """Return groups for an Atlassian accountId."""
-    import requests
-    from requests.auth import HTTPBasicAuth
-    
     base = config.get('url')
     if not base:
         raise ValueError('Missing url in config')
     url = base.rstrip('/') + '/rest/api/3/user/groups'
-    auth = HTTPBasicAuth(config.get('user'), config.get('password'))
 
     params = {'accountId': account_id, 'maxResults': 100}
-    r = requests.get(url, auth=auth, params=params)
+    r = http_session(config).get(url, params=params)
     if r.status_code >= 400:
         raise RuntimeError(f'Failed to fetch groups for {account_id}: {r.status_code} {r.text}')
     page = r.json()
@@ -233,62 +247,145 @@ def list_user_groups(config: dict, account_id: str) -> list:
 
 def add_user_to_group(config: dict, account_id: str, group_name: str) -> str:
     """Add a user to a group. Returns 'added', 'exists', or error string."""
-    import requests
-    from requests.auth import HTTPBasicAuth
-    
     base = config.get('url')
     if not base:
         raise ValueError('Missing url in config')
     url = base.rstrip('/') + '/rest/api/3/group/user'
-    auth = HTTPBasicAuth(config.get('user'), config.get('password'))
     params = {'groupname': group_name}
     payload = {'accountId': account_id}
-    r = requests.post(url, auth=auth, params=params, json=payload)
-    if r.status_code == 201:
-        return 'added'
-    if r.status_code == 409:
-        return 'exists'
-    return f'error:{r.status_code} {r.text}'
+    r = http_session(config).post(url, params=params, json=payload)
+    if r.status_code not in (201, 409):
+        return f'error:{r.status_code} {r.text}'
+    # keep an index built earlier in this run current
+    index = _group_index.get(base.rstrip('/'))
+    if index is not None:
+        index['members'].setdefault(account_id, set()).add(group_name)
+    return 'added' if r.status_code == 201 else 'exists'
+
+
+def _get_paged_values(session, url: str, params: dict, page_size: int = 50) -> list:
+    """Collect 'values' from a startAt/isLast paginated Jira REST endpoint."""
+    out = []
+    start_at = 0
+    while True:
+        r = session.get(url, params=dict(params, startAt=start_at, maxResults=page_size))
+        if r.status_code >= 400:
+            raise RuntimeError(f'Failed to fetch {url}: {r.status_code} {r.text}')
+        page = r.json()
+        values = page.get('values', [])
+        out.extend(values)
+        if page.get('isLast', True) or not values:
+            break
+        start_at += len(values)
+    return out
+
+
+def build_group_index(config: dict, refresh: bool = False, ttl: float = GROUP_INDEX_TTL,
+                      max_workers: int = MAX_WORKERS) -> dict:
+    """Build (or reuse) an inverted group-membership index for the site.
+
+    Enumerates every group via /rest/api/3/group/bulk and pages through the
+    members of each with a bounded thread pool. The index is kept for the
+    process and in the file cache for ttl seconds so repeated --listGroups or
+    copy_groups calls become local lookups.
+
+    Returns {'groups': {name: groupId}, 'members': {accountId: set(group names)}}.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    base = config.get('url')
+    if not base:
+        raise ValueError('Missing url in config')
+    base = base.rstrip('/')
+    cache_name = _group_cache_name(base)
+
+    if not refresh:
+        if base in _group_index:
+            return _group_index[base]
+        cached = load_cache(cache_name, ttl)
+        if cached:
+            index = {'groups': cached['groups'],
+                     'members': {aid: set(names) for aid, names in cached['members'].items()}}
+            _group_index[base] = index
+            return index
+
+    session = http_session(config)
+    groups = _get_paged_values(session, base + '/rest/api/3/group/bulk', {})
+    print(f'Indexing members of {len(groups)} groups...')
+
+    def members_of(g):
+        params = {'groupId': g.get('groupId'), 'includeInactiveUsers': 'true'}
+        return g.get('name'), _get_paged_values(session, base + '/rest/api/3/group/member', params)
 
+    members = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for name, users in pool.map(members_of, groups):
+            for u in users:
+                members.setdefault(u.get('accountId'), set()).add(name)
 
-def copy_groups(config: dict, src_account: str, dst_account: str, dry_run: bool = False) -> None:
-    """Copy all groups where src_account is a member to dst_account."""
-    groups = list_user_groups(config, src_account)
+    index = {'groups': {g.get('name'): g.get('groupId') for g in groups}, 'members': members}
+    _group_index[base] = index
+    _save_group_index(cache_name, index)
+    return index
+
+
+def _group_cache_name(base: str) -> str:
+    return 'groups-' + base.split('//')[-1].replace('/', '_')
+
+
+def _save_group_index(cache_name: str, index: dict) -> None:
+    save_cache(cache_name, {'groups': index['groups'],
+                            'members': {aid: sorted(names) for aid, names in index['members'].items()}})
+
+
+def indexed_user_groups(index: dict, account_id: str) -> list:
+    """Groups for account_id from a build_group_index index, shaped like list_user_groups."""
+    names = sorted(index['members'].get(account_id, ()))
+    return [{'name': n, 'groupId': index['groups'].get(n)} for n in names]
+
+
+def copy_groups(config: dict, src_account: str, dst_account: str, dry_run: bool = False,
+                max_workers: int = MAX_WORKERS, async_limit: int = 0) -> None:
+    """Copy all groups where src_account is a member to dst_account.
+
+    Memberships come from the group index; only groups dst_account is not yet
+    in are added, using a bounded pool of concurrent requests (or async_limit
+    requests in flight on one event loop).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    index = build_group_index(config)
+    groups = indexed_user_groups(index, src_account)
     if not groups:
         print(f'No groups found for source account {src_account}')
         return
+    dst_names = index['members'].get(dst_account, set())
+    todo = [g['name'] for g in groups if g['name'] not in dst_names]
+    already = len(groups) - len(todo)
     if dry_run:
-        dst_groups = list_user_groups(config, dst_account)
-        dst_names = {g.get('name') for g in dst_groups if isinstance(g, dict) and g.get('name')}
-        would_add = 0
-        already = 0
-        skipped = 0
         print(f'DRY-RUN: comparing groups from {src_account} to {dst_account}...')
         for g in groups:
-            name = g.get('name') if isinstance(g, dict) else None
-            if not name:
-                print('  - skipping group with no name field')
-                skipped += 1
-                continue
+            name = g['name']
             if name in dst_names:
                 print(f'  - {name}: already a member (would skip)')
-                already += 1
             else:
                 print(f'  - {name}: would add')
-                would_add += 1
-        print(f'DRY-RUN summary: would_add={would_add} already={already} skipped={skipped}')
+        print(f'DRY-RUN summary: would_add={len(todo)} already={already} skipped=0')
         return
 
     added = 0
-    exists = 0
+    exists = already
     errors = 0
     print(f'Copying groups from {src_account} to {dst_account}...')
-    for g in groups:
-        name = g.get('name') if isinstance(g, dict) else None
-        if not name:
-            print('  - skipping group with no name field')
-            continue
-        res = add_user_to_group(config, dst_account, name)
+    for name in sorted(dst_names & {g['name'] for g in groups}):
+        print(f"  - {name}: already a member")
+    if async_limit:
+        from opsMiles.ajira import run_bulk
+        results = run_bulk(config, 'add_user_to_group', [(dst_account, n) for n in todo], limit=async_limit)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(lambda n: add_user_to_group(config, dst_account, n), todo))
+    for name, res in zip(todo, results):
         if res == 'added':
             print(f"  - {name}: added")
             added += 1
@@ -298,6 +395,10 @@ def copy_groups(config: dict, src_account: str, dst_account: str, dry_run: bool
         else:
             print(f"  - {name}: {res}")
             errors += 1
+            continue
+        index['members'].setdefault(dst_account, set()).add(name)
+    if added:
+        _save_group_index(_group_cache_name(config.get('url').rstrip('/')), index)
     print(f'Finished: added={added} exists={exists} errors={errors}')
 
 
@@ -345,21 +446,33 @@ def add_watcher(jira: JIRA, config: dict, account_id: str, issue: str) -> str:
     return f'error:{r.status_code} {r.text}'
 
 
-def copy_watcher(config: dict, src: str, dst: str, pred: str) -> int:
-    """For tickets watched by src, add dst as a watcher also."""
+def copy_watcher(config: dict, src: str, dst: str, pred: str, async_limit: int = 0) -> int:
+    """For tickets watched by src, add dst as a watcher also.
+
+    With async_limit, up to that many watcher requests are in flight at once.
+    """
     jira = get_jira_from_config(config)
     issues = get_issues_watched(jira, src, pred)
     tot = len(issues)
     print(f"Got {tot} watched by {src}")
     problem = []
     count = 0
-    for i in issues:
-        s = add_watcher(jira, config, dst, i.key)
-        print(f'{i.key} ({count}/{tot}) {s}')
+
+    def record(key, s):
+        nonlocal count
+        print(f'{key} ({count}/{tot}) {s}')
         if s.startswith('added'):
             count += 1
         else:
-            problem.append(i.key)
+            problem.append(key)
+
+    if async_limit:
+        from opsMiles.ajira import run_bulk
+        run_bulk(config, 'add_watcher', [(dst, i.key) for i in issues], limit=async_limit,
+                 report=lambda n, args, s: record(args[1], s if isinstance(s, str) else f'error:{s}'))
+    else:
+        for i in issues:
+            record(i.key, add_watcher(jira, config, dst, i.key))
     print(f"Of {len(issues)} watched {count} PROBLEMS with :{problem}")
     print(f"PREOPS is ignored")
     return count
@@ -445,6 +558,14 @@ def copy_reporter(config: dict, src: str, dst: str, dry_run: bool, pred: str) ->
     return count
 
 
+def get_jira_fields(jira: JIRA) -> list:
+    """All Jira field definitions, fetched once per process and site."""
+    with _shared_lock:
+        if jira.server_url not in _jira_fields:
+            _jira_fields[jira.server_url] = jira.fields()
+        return _jira_fields[jira.server_url]
+
+
 def list_user_fields(jira: JIRA) -> list:
     """List all Jira fields that are user-type fields.
     
@@ -452,7 +573,7 @@ def list_user_fields(jira: JIRA) -> list:
     """
     user_fields = []
     try:
-        fields = jira.fields()
+        fields = get_jira_fields(jira)
         for field in fields:
             # Check if it's a user-type field by schema
             schema = field.get('schema', {})
@@ -479,7 +600,7 @@ def get_reviewer_field_id(jira: JIRA, field_name: str = 'Reviewer') -> str:
     Returns the field ID (e.g., 'customfield_10100') or empty string if not found.
     """
     try:
-        fields = jira.fields()
+        fields = get_jira_fields(jira)
         # First try exact match (case-insensitive)
         for field in fields:
             if field.get('name', '').lower() == field_name.lower():
@@ -568,7 +689,8 @@ def change_reviewer_quiet(jira: JIRA, issue_key: str, account_id: str, field_id:
         return False, str(e)
 
 
-def copy_reviewer(config: dict, src: str, dst: str, dry_run: bool, pred: str, field_name: str = 'Reviewer') -> int:
+def copy_reviewer(config: dict, src: str, dst: str, dry_run: bool, pred: str, field_name: str = 'Reviewer',
+                  async_limit: int = 0) -> int:
     """Change reviewer from src to dst on all issues where src is reviewer.
     
     Args:
@@ -578,6 +700,7 @@ def copy_reviewer(config: dict, src: str, dst: str, dry_run: bool, pred: str, fi
         dry_run: If True, only show what would be done
         pred: Additional JQL predicate
         field_name: Name of the reviewer field (default: 'Reviewer')
+        async_limit: If set, change reviewers with up to this many requests in flight
     """
     jira = get_jira_from_config(config)
     
@@ -600,27 +723,44 @@ def copy_reviewer(config: dict, src: str, dst: str, dry_run: bool, pred: str, fi
     print(f"Got {tot} where {src} is {field_name}")
     count = 0
     problem = []
+
+    def record(key, success, err):
+        nonlocal count
+        if success:
+            print(f"Changed reviewer ({count}/{tot}) {key}")
+            count += 1
+        else:
+            print(f"FAILED to change reviewer on {key}: {err}")
+            problem.append(key)
+
     if dry_run:
         print("NO changes - dry run only")
-    for i in issues:
-        if dry_run:
+        for i in issues:
             print(f"  Would change reviewer on {i.key}")
-        else:
-            success, err = change_reviewer_quiet(jira, i.key, dst, field_id)
-            if success:
-                print(f"Changed reviewer ({count}/{tot}) {i.key}")
-                count += 1
-            else:
-                print(f"FAILED to change reviewer on {i.key}: {err}")
-                problem.append(i.key)
+    elif async_limit:
+        from opsMiles.ajira import run_bulk
+
+        def report(n, args, res):
+            if isinstance(res, Exception):
+                res = (False, str(res))
+            record(args[0], *res)
+
+        run_bulk(config, 'change_reviewer_quiet', [(i.key, dst, field_id) for i in issues],
+                 limit=async_limit, report=report)
+    else:
+        for i in issues:
+            record(i.key, *change_reviewer_quiet(jira, i.key, dst, field_id))
     if not dry_run and problem:
         print(f"Of {tot} issues, changed {count}. PROBLEMS with: {problem}")
     print("PREOPS is ignored")
     return count
 
 
-def reassign(config: dict, src: str, dst: str, dry_run: bool, pred: str) -> int:
-    """Reassign tickets from src to dst account. Returns the count."""
+def reassign(config: dict, src: str, dst: str, dry_run: bool, pred: str, async_limit: int = 0) -> int:
+    """Reassign tickets from src to dst account. Returns the count.
+
+    With async_limit, up to that many assign requests are in flight at once.
+    """
     from jira import JIRAError
     
     jira = get_jira_from_config(config)
@@ -631,18 +771,35 @@ def reassign(config: dict, src: str, dst: str, dry_run: bool, pred: str) -> int:
     problem = []
     if dry_run:
         print("NO changes - dry run only ")
-    for i in issues:
-        v = False
-        if not dry_run:
+        problem = [i.key for i in issues]
+    elif async_limit:
+        from opsMiles.ajira import run_bulk
+
+        def report(n, args, v):
+            nonlocal count
+            if isinstance(v, Exception):
+                print(f'{args[0]} {v}')
+                v = False
+            else:
+                print(f"Assign ({count}/{tot}) {args[0]} to {dst}: {v}")
+            if v:
+                count += 1
+            else:
+                problem.append(args[0])
+
+        run_bulk(config, 'assign_issue_quiet', [(i.key, dst) for i in issues], limit=async_limit, report=report)
+    else:
+        for i in issues:
+            v = False
             try:
                 v = assign_issue_quiet(jira, i.key, dst)
                 print(f"Assign ({count}/{tot}) {i.key} to {dst}: {v}")
             except JIRAError as err:
                 print(f'{i.key} {err.text}')
-        if v:
-           count += 1
-        else:
-            problem.append(i.key)
+            if v:
+               count += 1
+            else:
+                problem.append(i.key)
 
     if dry_run:
         print("NO changes - dry run only ")
@@ -656,28 +813,32 @@ def reassign(config: dict, src: str, dst: str, dry_run: bool, pred: str) -> int:
 # Filter Operations
 # ============================================================================
 
-def get_user_filters(jira: JIRA, account_id: str) -> list:
+def get_user_filters(jira: JIRA, account_id: str, page_size: int = 100) -> list:
     """Get all filters owned by an account.
     
+    Pages through /filter/search and expands sharePermissions inline so the
+    share step does not need to fetch them per filter.
     Filters results to only include filters actually owned by the account,
     since the API may also return filters the user has access to.
     """
     url = f'{jira.server_url}/rest/api/3/filter/search'
-    params = {'accountId': account_id, 'maxResults': 100, 'expand': 'owner'}
-    r = jira._session.get(url, params=params)
-    if r.status_code == 200:
-        filters = r.json().get('values', [])
-        # Filter to only include filters actually owned by this account
-        owned = [f for f in filters if f.get('owner', {}).get('accountId') == account_id]
-        return owned
-    return []
+    params = {'accountId': account_id, 'expand': 'owner,sharePermissions'}
+    try:
+        filters = _get_paged_values(jira._session, url, params, page_size=page_size)
+    except Exception as e:
+        print(f"Error listing filters for {account_id}: {e}")
+        return []
+    # Filter to only include filters actually owned by this account
+    owned = [f for f in filters if f.get('owner', {}).get('accountId') == account_id]
+    return owned
 
 
-def share_filter(jira: JIRA, filter_id: int, account_id: str) -> tuple:
+def share_filter(jira: JIRA, filter_id: int, account_id: str, share_permissions: list = None) -> tuple:
     """Grant edit permission on a filter to a user and change ownership.
     
     Returns (success: bool, error_msg: str or None)
     If the filter is already shared with 'loggedin' or 'global', skips sharing but still tries to change owner.
+    share_permissions may be passed (e.g. from get_user_filters) to avoid fetching them again.
     """
     from jira import JIRAError
     
@@ -696,21 +857,22 @@ def share_filter(jira: JIRA, filter_id: int, account_id: str) -> tuple:
     # Check existing permissions first
     skip_share = False
     try:
-        r = jira._session.get(url)
-        if r.status_code == 200:
-            perms = r.json()
-            for p in perms:
-                ptype = p.get('type', '')
-                # If already shared with all logged-in users or globally, user already has access
-                if ptype in ('loggedin', 'global'):
-                    messages.append(f"already shared with {ptype}")
-                    skip_share = True
-                    break
-                # If already shared with this specific user, skip
-                if ptype == 'user' and p.get('user', {}).get('accountId') == account_id:
-                    messages.append("already shared with user")
-                    skip_share = True
-                    break
+        perms = share_permissions
+        if perms is None:
+            r = jira._session.get(url)
+            perms = r.json() if r.status_code == 200 else []
+        for p in perms:
+            ptype = p.get('type', '')
+            # If already shared with all logged-in users or globally, user already has access
+            if ptype in ('loggedin', 'global'):
+                messages.append(f"already shared with {ptype}")
+                skip_share = True
+                break
+            # If already shared with this specific user, skip
+            if ptype == 'user' and p.get('user', {}).get('accountId') == account_id:
+                messages.append("already shared with user")
+                skip_share = True
+                break
     except Exception:
         pass  # Continue to try adding permission anyway
     
@@ -762,25 +924,50 @@ def change_filter_owner(jira: JIRA, filter_id: int, new_owner_account_id: str) -
         return False, str(e)
 
 
-def share_all_filters(jira: JIRA, src: str, dst: str, dry_run: bool = False) -> int:
-    """Transfer all filters owned by src user to dst user (changes owner and grants edit)."""
+def share_all_filters(jira: JIRA, src: str, dst: str, dry_run: bool = False,
+                      max_workers: int = MAX_WORKERS, async_limit: int = 0) -> int:
+    """Transfer all filters owned by src user to dst user (changes owner and grants edit).
+
+    Transfers run on a bounded thread pool, or with async_limit requests in flight
+    on one event loop; results are printed in filter order.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
     filters = get_user_filters(jira, src)
     transferred = 0
     failed = 0
     print(f"Found {len(filters)} filters owned by {src}")
-    for f in filters:
-        fid = f['id']
-        fname = f['name']
-        if dry_run:
-            print(f"  Would transfer filter {fid}: {fname}")
+
+    def record(f, success, msg):
+        nonlocal transferred, failed
+        if success:
+            print(f"  Transferred filter {f['id']}: {f['name']} ({msg})")
+            transferred += 1
         else:
-            success, msg = share_filter(jira, fid, dst)
-            if success:
-                print(f"  Transferred filter {fid}: {fname} ({msg})")
-                transferred += 1
-            else:
-                print(f"  FAILED filter {fid}: {fname} - {msg}")
-                failed += 1
+            print(f"  FAILED filter {f['id']}: {f['name']} - {msg}")
+            failed += 1
+
+    if dry_run:
+        for f in filters:
+            print(f"  Would transfer filter {f['id']}: {f['name']}")
+    elif async_limit:
+        from opsMiles.ajira import run_bulk
+
+        def report(n, args, res):
+            if isinstance(res, Exception):
+                res = (False, str(res))
+            record(filters[n], *res)
+
+        run_bulk(_config_from_jira(jira), 'share_filter',
+                 [(f['id'], dst, f.get('sharePermissions')) for f in filters],
+                 limit=async_limit, report=report)
+    else:
+        def transfer(f):
+            return share_filter(jira, f['id'], dst, share_permissions=f.get('sharePermissions'))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for f, res in zip(filters, pool.map(transfer, filters)):
+                record(f, *res)
     print(f"Filters: total={len(filters)} transferred={transferred} failed={failed}")
     return transferred
 
@@ -795,15 +982,40 @@ def get_user_dashboards(jira: JIRA, account_id: str) -> list:
     Filters results to only include dashboards actually owned by the account.
     """
     url = f'{jira.server_url}/rest/api/3/dashboard/search'
-    params = {'accountId': account_id, 'maxResults': 100}
-    r = jira._session.get(url, params=params)
-    if r.status_code == 200:
-        dashboards = r.json().get('values', [])
-        return dashboards
-    return []
+    params = {'accountId': account_id}
+    try:
+        return _get_paged_values(jira._session, url, params, page_size=100)
+    except Exception as e:
+        print(f"Error listing dashboards for {account_id}: {e}")
+        return []
+
 
+def get_api_account_id(jira: JIRA) -> str:
+    """Account id of the user the API calls run as, or '' if it cannot be found."""
+    try:
+        me_r = jira._session.get(f'{jira.server_url}/rest/api/3/myself')
+        return me_r.json().get('accountId', '') if me_r.status_code == 200 else ''
+    except Exception:
+        return ''
+
+
+def build_dashboard_index(jira: JIRA) -> dict:
+    """Map dashboard name -> list of dashboard dicts (with owner) for every dashboard visible.
+
+    Pages through /dashboard/search so copies beyond the first page are found too.
+    """
+    url = f'{jira.server_url}/rest/api/3/dashboard/search'
+    index = {}
+    try:
+        for dash in _get_paged_values(jira._session, url, {'expand': 'owner'}, page_size=100):
+            index.setdefault(dash.get('name'), []).append(dash)
+    except Exception as e:
+        print(f"Error indexing dashboards: {e}")
+    return index
 
-def cp_dashboard_share(jira: JIRA, dashboard_id: str, new_owner_id: str, src_owner_id: str = None) -> tuple:
+
+def cp_dashboard_share(jira: JIRA, dashboard_id: str, new_owner_id: str, src_owner_id: str = None,
+                       api_user_id: str = None, dashboard_index: dict = None) -> tuple:
     """Copy a dashboard and share with new user, preserving original visibility.
 
     
@@ -815,14 +1027,15 @@ def cp_dashboard_share(jira: JIRA, dashboard_id: str, new_owner_id: str, src_own
     
     Args:
         src_owner_id: Optional source owner ID - used to restrict which dashboards can be deleted
+        api_user_id: Optional account id of the API user (looked up if not given)
+        dashboard_index: Optional build_dashboard_index result, reused and kept up to date
+            across calls (built if not given)
     """
     # Get the current API user ID
-    try:
-        me_url = f'{jira.server_url}/rest/api/3/myself'
-        me_r = jira._session.get(me_url)
-        api_user_id = me_r.json().get('accountId', '') if me_r.status_code == 200 else ''
-    except Exception:
-        api_user_id = ''
+    if api_user_id is None:
+        api_user_id = get_api_account_id(jira)
+    if dashboard_index is None:
+        dashboard_index = build_dashboard_index(jira)
     
     # First get the dashboard details
     get_url = f'{jira.server_url}/rest/api/3/dashboard/{dashboard_id}'
@@ -885,26 +1098,22 @@ def cp_dashboard_share(jira: JIRA, dashboard_id: str, new_owner_id: str, src_own
         allowed_owners = {new_owner_id, api_user_id}
         allowed_owners.discard('')  # Remove empty strings
         
-        search_url = f'{jira.server_url}/rest/api/3/dashboard/search'
-        params = {'maxResults': 200, 'expand': 'owner'}
-        r = jira._session.get(search_url, params=params)
-        if r.status_code == 200:
-            existing = r.json().get('values', [])
-            for existing_dash in existing:
-                if existing_dash.get('name') == dash_name:
-                    existing_id = existing_dash.get('id')
-                    # Skip the source dashboard
-                    if str(existing_id) == str(dashboard_id):
-                        continue
-                    # Only delete if owner is in allowed list
-                    owner_id = existing_dash.get('owner', {}).get('accountId', '')
-                    if owner_id not in allowed_owners:
-                        continue
-                    # Try to delete it
-                    del_url = f'{jira.server_url}/rest/api/3/dashboard/{existing_id}'
-                    del_r = jira._session.delete(del_url)
-                    if del_r.status_code in (200, 204):
-                        print(f"    Deleted existing dashboard {existing_id}: {dash_name}")
+        existing = dashboard_index.get(dash_name, [])
+        for existing_dash in list(existing):
+            existing_id = existing_dash.get('id')
+            # Skip the source dashboard
+            if str(existing_id) == str(dashboard_id):
+                continue
+            # Only delete if owner is in allowed list
+            owner_id = existing_dash.get('owner', {}).get('accountId', '')
+            if owner_id not in allowed_owners:
+                continue
+            # Try to delete it
+            del_url = f'{jira.server_url}/rest/api/3/dashboard/{existing_id}'
+            del_r = jira._session.delete(del_url)
+            if del_r.status_code in (200, 204):
+                print(f"    Deleted existing dashboard {existing_id}: {dash_name}")
+                existing.remove(existing_dash)
         
         # Copy the dashboard preserving original permissions
         copy_url = f'{jira.server_url}/rest/api/3/dashboard/{dashboard_id}/copy'
@@ -918,6 +1127,8 @@ def cp_dashboard_share(jira: JIRA, dashboard_id: str, new_owner_id: str, src_own
         if r.status_code in (200, 201):
             new_dash = r.json()
             new_id = new_dash.get('id', 'unknown')
+            new_dash.setdefault('owner', {'accountId': api_user_id})
+            dashboard_index.setdefault(dash_name, []).append(new_dash)
             return True, f"copied to dashboard {new_id}"
         
         try:
@@ -931,7 +1142,8 @@ def cp_dashboard_share(jira: JIRA, dashboard_id: str, new_owner_id: str, src_own
         return False, str(e)
 
 
-def transfer_dashboard(jira: JIRA, dashboard_id: str, new_owner_id: str, src_owner_id: str = None) -> tuple:
+def transfer_dashboard(jira: JIRA, dashboard_id: str, new_owner_id: str, src_owner_id: str = None,
+                       api_user_id: str = None, dashboard_index: dict = None) -> tuple:
     """Transfer a dashboard to a new owner by copying it.
     
     Note: Jira Cloud doesn't have an API to change dashboard ownership.
@@ -939,19 +1151,27 @@ def transfer_dashboard(jira: JIRA, dashboard_id: str, new_owner_id: str, src_own
     
     Returns (success: bool, message: str)
     """
-    success, msg = cp_dashboard_share(jira, dashboard_id, new_owner_id, src_owner_id=src_owner_id)
+    success, msg = cp_dashboard_share(jira, dashboard_id, new_owner_id, src_owner_id=src_owner_id,
+                                      api_user_id=api_user_id, dashboard_index=dashboard_index)
     return success, msg if msg else "copied"
 
 
 def transfer_user_dashboards(jira: JIRA, src_account: str, dst_account: str, dry_run: bool = False) -> tuple:
     """Transfer all dashboards from src user to dst user (changes owner and grants edit).
     
+    The API user and the name -> dashboard index are resolved once and shared
+    by every copy.
     Returns (transferred_count, failed_count)
     """
     dashboards = get_user_dashboards(jira, src_account)
     transferred = 0
     failed = 0
     print(f"Found {len(dashboards)} dashboards owned by {src_account}")
+    api_user_id = None
+    dashboard_index = None
+    if dashboards and not dry_run:
+        api_user_id = get_api_account_id(jira)
+        dashboard_index = build_dashboard_index(jira)
     
     for dash in dashboards:
         dash_id = dash.get('id')
@@ -961,7 +1181,8 @@ def transfer_user_dashboards(jira: JIRA, src_account: str, dst_account: str, dry
             print(f"  Would transfer dashboard {dash_id}: {dash_name}")
             transferred += 1
         else:
-            success, msg = transfer_dashboard(jira, dash_id, dst_account, src_owner_id=src_account)
+            success, msg = transfer_dashboard(jira, dash_id, dst_account, src_owner_id=src_account,
+                                              api_user_id=api_user_id, dashboard_index=dashboard_index)
             if success:
                 print(f"  Transferred dashboard {dash_id}: {dash_name} ({msg})")
                 transferred += 1
@@ -0,0 +1,298 @@
+"""
+Shared HTTP transport for the Atlassian REST calls.
+
+RateLimitedAdapter is the requests adapter mounted (via opsMiles.clients) on every
+Jira, Confluence and plain REST session. Each request first takes a token from a
+per-site token bucket and a slot under an AIMD concurrency limit. HTTP 429 responses, and
+503 responses to idempotent requests (a 503 may follow a write the server applied),
+are retried after the server's Retry-After / X-RateLimit-Reset hint, or an
+exponential backoff with full jitter, and shrink both the rate and the concurrency;
+successful responses slowly grow them back. Parallel modes can then run close to the
+site quota without failing a multi-hour job on a throttled request.
+The adapter is also where a cassette (opsMiles.cassette) records or replays traffic,
+and where repeated identical GETs within a run are answered from a ResponseMemo.
+"""
+
+import copy
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = (429, 503)
+
+# Methods safe to resend after a 503, which may come back after the server applied the write;
+# 429 means the request was refused and is retried for every method
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+# Request header that makes a GET skip the memo (e.g. when polling for a change)
+NO_MEMO_HEADER = 'X-OpsMiles-No-Memo'
+
+# Leading path segments of the Jira / Confluence REST APIs, before the resource collection
+API_PREFIXES = ('wiki', 'rest', 'api', 'agile', 'v2', '1.0', '2', '3', 'latest')
+
+# Path segments of query endpoints (/search, /content/search, /user/search) whose results
+# depend on other resources; they are never memoized
+QUERY_COLLECTIONS = ('search',)
+
+# Collections memoized as another one: Confluence v2 views of v1 'content', and
+# group memberships, which are read both as group members and as /user/groups
+COLLECTION_ALIASES = {'pages': 'content', 'blogposts': 'content', 'spaces': 'space', 'group': 'user'}
+
+# POST endpoints that only read (permission checks, CQL/JQL searches); they invalidate nothing
+READ_ONLY_POSTS = ('/permission/check', '/search', '/search/jql')
+
+# Other collections whose reads a write to a collection can change
+# (Confluence user/watch writes show in /content/{id}/notification reads)
+RELATED_COLLECTIONS = {'user': ('content',)}
+
+
+def normalize_url(url: str) -> str:
+    """URL with its query parameters sorted, so equivalent requests match."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+
+
+def resource_collection(url: str) -> str:
+    """The REST collection a URL belongs to, e.g. 'issue', 'user', 'content', 'space'."""
+    for segment in urlsplit(url).path.strip('/').split('/'):
+        if segment and segment not in API_PREFIXES:
+            return COLLECTION_ALIASES.get(segment, segment)
+    return ''
+
+
+def retry_after_seconds(headers) -> float:
+    """Seconds the server asked us to wait, from Retry-After or X-RateLimit-Reset; None if absent."""
+    value = headers.get('Retry-After') or headers.get('Beta-Retry-After')
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(value)
+                return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    reset = headers.get('X-RateLimit-Reset')
+    if reset:
+        try:
+            when = datetime.fromisoformat(reset.replace('Z', '+00:00'))
+            return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+        except ValueError:
+            pass
+    return None
+
+
+def should_retry(method: str, status: int) -> bool:
+    """True if a response with status may be retried for a request with method."""
+    if status == 429:
+        return True
+    return status in RETRY_STATUS and method.upper() in IDEMPOTENT_METHODS
+
+
+class RateLimiter:
+    """Token bucket plus AIMD concurrency limit shared by all sessions of a site."""
+
+    def __init__(self, rate: float = 20.0, burst: int = 20, concurrency: int = 8,
+                 max_concurrency: int = 16, min_rate: float = 0.5, max_rate: float = 100.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.limit = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.tokens = float(burst)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._stamp = time.monotonic()
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self) -> None:
+        """Block until a token and a concurrency slot are available."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.in_flight += 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, throttled: bool = False, wait: float = None, near_limit: bool = False) -> None:
+        """Give back the slot and adapt: multiplicative decrease on throttling, additive increase otherwise."""
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.throttled += 1
+                # one cut per burst: concurrent requests throttled together count once
+                if now - self._last_cut > 1.0:
+                    self._last_cut = now
+                    self.limit = max(1.0, self.limit / 2)
+                    self.rate = max(self.min_rate, self.rate / 2)
+                if wait:
+                    self.paused_until = max(self.paused_until, now + wait)
+            elif near_limit:
+                self.rate = max(self.min_rate, self.rate * 0.9)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.rate = min(self.max_rate, self.rate + 0.1)
+            self._cond.notify_all()
+
+
+class ResponseMemo:
+    """Per-run memo of successful GET responses, keyed on credentials and normalized URL.
+
+    A write (any other method, except the READ_ONLY_POSTS) to a collection forgets every memoized read of that
+    collection and its related collections, so a read after a write always goes to the
+    server. Query collections (search) are never memoized, nor are requests carrying
+    NO_MEMO_HEADER. The least recently used responses are dropped beyond max_entries
+    or max_bytes of body.
+    """
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request) -> tuple:
+        auth = request.headers.get('Authorization', '')
+        return (hashlib.sha1(auth.encode('utf-8')).hexdigest()[:12],
+                request.headers.get('Accept', ''), normalize_url(request.url))
+
+    @staticmethod
+    def memoizable(request, kwargs) -> bool:
+        return request.method in ('GET', 'HEAD') and not kwargs.get('stream') \
+            and NO_MEMO_HEADER not in request.headers \
+            and not set(urlsplit(request.url).path.split('/')) & set(QUERY_COLLECTIONS)
+
+    @staticmethod
+    def is_write(request) -> bool:
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return False
+        return not (request.method == 'POST' and urlsplit(request.url).path.rstrip('/').endswith(READ_ONLY_POSTS))
+
+    def get(self, request):
+        with self._lock:
+            response = self._entries.get(self.key(request))
+            if response is None:
+                return None
+            self._entries.move_to_end(self.key(request))
+            self.hits += 1
+        hit = copy.copy(response)
+        hit.request = request
+        return hit
+
+    def put(self, request, response) -> None:
+        if not 200 <= response.status_code < 300:
+            return
+        size = len(response.content or b'')  # read the body so copies do not share a consumed stream
+        if size > self.max_bytes:
+            return
+        response._memo_collection = resource_collection(request.url)
+        key = self.key(request)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = response
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key) -> None:
+        response = self._entries.pop(key)
+        self.size -= len(response.content or b'')
+
+    def invalidate(self, request) -> None:
+        """Forget reads that a write by request may have changed."""
+        collection = resource_collection(request.url)
+        stale = {collection, *RELATED_COLLECTIONS.get(collection, ())}
+        with self._lock:
+            for key in [k for k, r in self._entries.items() if r._memo_collection in stale]:
+                self._drop(key)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that paces requests through a RateLimiter and retries throttled ones."""
+
+    def __init__(self, limiter: RateLimiter = None, max_retries_429: int = 8,
+                 backoff: float = 1.0, max_backoff: float = 60.0, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter or RateLimiter()
+        self.max_retries_429 = max_retries_429
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cassette = None
+        self.memo = None
+
+    def send(self, request, **kwargs):
+        memo = self.memo
+        if memo is None:
+            return self._send(request, **kwargs)
+        # decided before NO_MEMO_HEADER is stripped, so opted-out reads are neither served nor stored
+        memoizable = memo.memoizable(request, kwargs)
+        write = memo.is_write(request)
+        if memoizable:
+            hit = memo.get(request)
+            if hit is not None:
+                return hit
+        elif write:
+            memo.invalidate(request)
+        request.headers.pop(NO_MEMO_HEADER, None)
+        response = self._send(request, **kwargs)
+        if memoizable:
+            memo.put(request, response)
+        elif write:
+            # again, for reads that raced the write
+            memo.invalidate(request)
+        return response
+
+    def _send(self, request, **kwargs):
+        cassette = self.cassette
+        if cassette is not None and cassette.replaying:
+            return cassette.play(request, self)
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                response = super().send(request, **kwargs)
+            except Exception:
+                self.limiter.release()
+                raise
+            if not should_retry(request.method, response.status_code) or attempt >= self.max_retries_429:
+                near = response.headers.get('X-RateLimit-NearLimit', '').lower() == 'true'
+                self.limiter.release(near_limit=near)
+                if cassette is not None:
+                    cassette.record(request, response)
+                return response
+            hint = retry_after_seconds(response.headers)
+            # full jitter: random point in the exponential window, never sooner than the server asked
+            wait = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if hint is not None:
+                wait += hint
+            self.limiter.release(throttled=True, wait=wait)
+            print(f"  HTTP {response.status_code} from {request.url.split('?')[0]}, "
+                  f"retrying in {wait:.1f}s ({attempt + 1}/{self.max_retries_429})")
+            response.close()
+            attempt += 1
@@ -0,0 +1,58 @@
+"""
+Replaying a cassette must not touch the network, including the requests the jira
+client makes while it is being set up (serverInfo, myself).
+"""
+
+import json
+
+import pytest
+import requests.adapters
+
+from opsMiles import clients
+
+URL = 'https://example.atlassian.net'
+CONFIG = {'url': URL, 'user': 'someone@example.org', 'password': 'token'}
+
+
+def _entry(path, content):
+    return {'method': 'GET', 'url': URL + path, 'body': '', 'status': 200, 'reason': 'OK',
+            'headers': {'Content-Type': 'application/json'}, 'elapsed': 0.01, 'content': json.dumps(content)}
+
+
+@pytest.fixture
+def no_network(monkeypatch):
+    def send(self, request, **kwargs):
+        raise AssertionError(f'network used: {request.method} {request.url}')
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, 'send', send)
+    yield
+    clients.reset()
+    if clients._cassette is not None:
+        clients._cassette.close()
+        clients._cassette = None
+
+
+def test_jira_client_replays_without_network(tmp_path, no_network):
+    cassette = tmp_path / 'session.jsonl'
+    entries = [_entry('/rest/api/2/serverInfo', {'versionNumbers': [1001, 0, 0], 'deploymentType': 'Cloud'}),
+               _entry('/rest/api/2/myself', {'accountId': 'abc'})]
+    cassette.write_text(''.join(json.dumps(e) + '\n' for e in entries))
+
+    clients.reset()
+    clients.use_cassette(str(cassette), 'replay')
+    jira = clients.jira_client(CONFIG)
+
+    assert jira.deploymentType == 'Cloud'
+    assert jira._version == (1001, 0, 0)
+    assert clients.active_cassette().count == 2
+    assert clients.active_cassette().missed == 0
+
+
+def test_jira_client_fails_fast_on_empty_cassette(tmp_path, no_network):
+    cassette = tmp_path / 'empty.jsonl'
+    cassette.write_text('')
+
+    clients.reset()
+    clients.use_cassette(str(cassette), 'replay')
+    with pytest.raises(Exception, match='serverInfo'):
+        clients.jira_client(CONFIG)